@@ -1,120 +1,578 @@
-from copy import deepcopy
 import csv
+import random
 
-class RushHourPuzzle:    
 
-    def __init__(self, csv_file):         
-        # Initialize the RushHourPuzzle Board        
-        self.setVehicles(csv_file)         
-        self.setBoard()   
+_zobristRandom = random.Random(0x5EED)
+_zobristWords = []
+
+
+def zobristWords(count):
+    """The first count words of the Zobrist stream, as a tuple."""
+    while len(_zobristWords) < count:
+        _zobristWords.append(_zobristRandom.getrandbits(64))
+    return tuple(_zobristWords[:count])
+
+
+class Layout:
+    """
+    Static part of a puzzle, shared by every state reached from it:
+    board size, walls and the id / orientation / length / lane of each vehicle.
+    The lane is the fixed coordinate of a vehicle (y for 'H', x for 'V').
+    """
+
+    def __init__(self, board_width, board_height, walls, ids, orientations, lengths, lanes):
+        self.board_width = board_width
+        self.board_height = board_height
+        self.walls = tuple(walls)
+        self.ids = tuple(ids)
+        self.orientations = tuple(orientations)
+        self.lengths = tuple(lengths)
+        self.lanes = tuple(lanes)
+        self.xIndex = self.ids.index('X') if 'X' in self.ids else None
+        # first cell of car X's row in the flat board, looked up by every heuristic
+        self.xRowStart = self.lanes[self.xIndex] * board_width if self.xIndex is not None else None
+        # flat board with only the walls painted, copied for each occupancy grid
+        self.emptyBoard = [' '] * (board_width * board_height)
+        for x, y in self.walls:
+            self.emptyBoard[y * board_width + x] = '#'
+        # Zobrist table: one random 64-bit word per (vehicle, offset), taken in order
+        # from a stream with a fixed seed so that the same layout hashes the same way
+        # in every process. The stream is shared, each layout only slices it.
+        sizes = [(board_width if o == 'H' else board_height) - length + 1
+                 for o, length in zip(self.orientations, self.lengths)]
+        words = zobristWords(sum(sizes))
+        self.zobrist, start = [], 0
+        for size in sizes:
+            self.zobrist.append(words[start:start + size])
+            start += size
+        self.zobrist = tuple(self.zobrist)
+
+        self.indexOf = {vehicle_id: index for index, vehicle_id in enumerate(self.ids)}
+        # action name -> move code, see moveCode
+        self.moveCodes = {}
+        # (back, forth) direction letters and single-cell action names of each vehicle
+        self.directions = tuple(('L', 'R') if orientation == 'H' else ('U', 'D') for orientation in self.orientations)
+        self.moveNames = tuple((f"{vehicle_id}:{back}", f"{vehicle_id}:{forth}")
+                               for vehicle_id, (back, forth) in zip(self.ids, self.directions))
+        for index, (back, forth) in enumerate(self.moveNames):
+            self.moveCodes[back] = self.moveCode(index, -1)
+            self.moveCodes[forth] = self.moveCode(index, 1)
+        # bits per offset when a state is packed into a single integer
+        self.packBits = max(board_width, board_height).bit_length()
+        # (vehicle, offset, first cell, last cell) -> clearingOptions, filled in on demand
+        self.clearingTable = {}
+
+    # Tables built on first use by __getattr__ (attribute -> builder): a reader that
+    # loads many layouts (bundle.PuzzleBundle) only pays for the ones searched.
+    LAZY = dict.fromkeys(("wallRows", "wallColumns", "rowMasks", "columnMasks", "laneShifts", "laneSizes"),
+                         "buildBitboards")
+
+    def __getattr__(self, name):
+        # only called for attributes not set yet
+        builder = Layout.LAZY.get(name)
+        if builder is None:
+            raise AttributeError(f"'Layout' object has no attribute '{name}'")
+        getattr(self, builder)()
+        return self.__dict__[name]
+
+    def buildBitboards(self):
+        """
+        Occupancy bitboards are Python ints with one bit per cell, kept in two orders:
+        `rows` (bit y * w + x) and `columns` (bit x * h + y). The lane of a horizontal
+        vehicle is then a run of w contiguous bits of `rows` starting at laneShifts[i],
+        and the lane of a vertical one a run of h bits of `columns`. rowMasks[i][p] and
+        columnMasks[i][p] are the cells of vehicle i at offset p in both orders, and
+        any number of vehicles and board sizes fit since ints are unbounded.
+        """
+        w, h = self.board_width, self.board_height
+        self.wallRows = sum(1 << (y * w + x) for x, y in self.walls)
+        self.wallColumns = sum(1 << (x * h + y) for x, y in self.walls)
+        self.rowMasks, self.columnMasks, self.laneShifts, self.laneSizes = [], [], [], []
+        for orientation, length, lane in zip(self.orientations, self.lengths, self.lanes):
+            size = w if orientation == 'H' else h
+            run = (1 << length) - 1
+            if orientation == 'H':
+                rows = [run << (lane * w + p) for p in range(size - length + 1)]
+                columns = [sum(1 << ((p + i) * h + lane) for i in range(length)) for p in range(size - length + 1)]
+                self.laneShifts.append(lane * w)
+            else:
+                rows = [sum(1 << ((p + i) * w + lane) for i in range(length)) for p in range(size - length + 1)]
+                columns = [run << (lane * h + p) for p in range(size - length + 1)]
+                self.laneShifts.append(lane * h)
+            self.rowMasks.append(tuple(rows))
+            self.columnMasks.append(tuple(columns))
+            self.laneSizes.append(size)
+
+    def occupancy(self, positions):
+        """(rows, columns) bitboards of the vehicles at these offsets and of the walls."""
+        rows, columns = self.wallRows, self.wallColumns
+        for row_masks, column_masks, position in zip(self.rowMasks, self.columnMasks, positions):
+            rows |= row_masks[position]
+            columns |= column_masks[position]
+        return rows, columns
+
+    def clearingOptions(self, index, position, first, last):
+        """
+        Ways for vehicle `index` at `position` to leave the cells first..last of its
+        lane (flat board indices): a list of (cells to move, cells it sweeps on the
+        way, in increasing order). Directions that leave the board or hit a wall are
+        left out. Each answer is computed once per layout and kept in clearingTable.
+        """
+        key = (index, position, first, last)
+        options = self.clearingTable.get(key)
+        if options is None:
+            options = []
+            length, w = self.lengths[index], self.board_width
+            if self.orientations[index] == 'H':
+                size, low, high = w, first % w, last % w
+            else:
+                size, low, high = self.board_height, first // w, last // w
+            # back: the last cell ends just before low; forth: the first cell just after high
+            for target in (low - length, high + 1):
+                if target < 0 or target + length > size:
+                    continue
+                swept = range(target, position) if target < position else range(position + length, target + length)
+                cells = tuple(self.cellIndex(index, offset) for offset in swept)
+                if all(self.emptyBoard[cell] != '#' for cell in cells):
+                    options.append((abs(target - position), cells))
+            self.clearingTable[key] = options
+        return options
+
+    def cellIndex(self, index, offset):
+        # flat board index of the cell at `offset` along the lane of vehicle `index`
+        x, y = self.vehicleXY(index, offset)
+        return y * self.board_width + x
+
+    @staticmethod
+    def moveCode(index, delta):
+        # one bit per single-cell move, so a set of moves fits in an int
+        return 2 * index + (delta > 0)
+
+    def redundant(self, positions, last_moves, index, delta):
+        """
+        Move pruning. last_moves is the bit set (1 << moveCode) of the moves that led
+        to the state `positions` along shortest paths. The move (index, delta) is
+        redundant if, after each of them, either
+          - it undoes that move (same vehicle, opposite direction), or
+          - it commutes with it and moves a vehicle of smaller index: the two moves
+            are independent unless the last one freed the very cell this one enters,
+            and independent moves are only explored by increasing vehicle index.
+        Any path holding such a pair can be made shorter, or lexicographically smaller
+        at the same length, so the least optimal path in (length, vehicle index
+        sequence) order never uses one: pruning keeps at least one optimal path.
+        """
+        if not last_moves:
+            return False
+        length = self.lengths[index]
+        entered = self.vehicleXY(index, positions[index] + length if delta > 0 else positions[index] - 1)
+        while last_moves:
+            bit = last_moves & -last_moves
+            last_moves ^= bit
+            code = bit.bit_length() - 1
+            last_index, last_forth = code >> 1, code & 1
+            if last_index == index:
+                if last_forth == (delta > 0):
+                    return False
+            elif last_index < index:
+                return False
+            else:
+                last_position = positions[last_index]
+                freed = last_position - 1 if last_forth else last_position + self.lengths[last_index]
+                if self.vehicleXY(last_index, freed) == entered:
+                    return False
+        return True
+
+    def pack(self, positions):
+        key = 0
+        for position in positions:
+            key = (key << self.packBits) | position
+        return key
+
+    def unpack(self, key):
+        mask = (1 << self.packBits) - 1
+        positions = []
+        for _ in self.ids:
+            positions.append(key & mask)
+            key >>= self.packBits
+        return tuple(reversed(positions))
+
+    def toDict(self):
+        return {"board_width": self.board_width, "board_height": self.board_height,
+                "walls": [list(wall) for wall in self.walls], "ids": list(self.ids),
+                "orientations": list(self.orientations), "lengths": list(self.lengths), "lanes": list(self.lanes)}
+
+    @classmethod
+    def fromDict(cls, data):
+        return cls(data["board_width"], data["board_height"], [tuple(wall) for wall in data["walls"]],
+                   data["ids"], data["orientations"], data["lengths"], data["lanes"])
+
+    def zobristKey(self, positions):
+        key = 0
+        for index, position in enumerate(positions):
+            key ^= self.zobrist[index][position]
+        return key
+
+    def vehicleXY(self, index, position):
+        if self.orientations[index] == 'H':
+            return position, self.lanes[index]
+        return self.lanes[index], position
+
+
+class RushHourPuzzle:
+    """
+    Immutable compact state: a shared Layout plus a tuple holding the offset of
+    each vehicle along its lane, and the Zobrist hash of that tuple.
+    The 2D board is only built on demand.
+    """
+
+    __slots__ = ("layout", "positions", "hashKey", "_board")
+
+    def __init__(self, csv_file):
+        # Initialize the RushHourPuzzle Board
+        self.setVehicles(csv_file)
+        self.hashKey = self.layout.zobristKey(self.positions)
+        self._board = None
+
+    @classmethod
+    def fromPositions(cls, layout, positions, hashKey=None):
+        state = cls.__new__(cls)
+        state.layout = layout
+        state.positions = positions
+        state.hashKey = layout.zobristKey(positions) if hashKey is None else hashKey
+        state._board = None
+        return state
 
     def setVehicles(self, csv_file):
-        # Open file 
-        with open(csv_file, newline='') as f: 
-            reader = csv.reader(f) 
-            w, h = next(reader)  
-            self.board_width, self.board_height = int(w), int(h) 
-            self.vehicles = []
-            self.walls = []
-            for line in reader:  
+        # Open file
+        with open(csv_file, newline='') as f:
+            reader = csv.reader(f)
+            w, h = next(reader)
+            walls, ids, orientations, lengths, lanes, positions = [], [], [], [], [], []
+            for line in reader:
+                if not line:
+                    continue
                 if line[0] == '#':
-                    self.walls.append((int(line[1]), int(line[2])))
-                else:        
+                    walls.append((int(line[1]), int(line[2])))
+                else:
                     id, x, y, orientation, length = line
-                    vehicle = {"id": id, "x": int(x), "y": int(y), "orientation": orientation, "length": int(length)}
-                    self.vehicles.append(vehicle)            
-    
+                    ids.append(id)
+                    orientations.append(orientation)
+                    lengths.append(int(length))
+                    if orientation == 'H':
+                        lanes.append(int(y))
+                        positions.append(int(x))
+                    else:
+                        lanes.append(int(x))
+                        positions.append(int(y))
+        self.layout = Layout(int(w), int(h), walls, ids, orientations, lengths, lanes)
+        self.positions = tuple(positions)
+
+    def saveCsv(self, csv_file):
+        # write the state back in the format read by setVehicles
+        layout = self.layout
+        with open(csv_file, "w", newline='') as f:
+            writer = csv.writer(f, lineterminator="\n")
+            writer.writerow([layout.board_width, layout.board_height])
+            for x, y in layout.walls:
+                writer.writerow(['#', x, y])
+            for index, position in enumerate(self.positions):
+                x, y = layout.vehicleXY(index, position)
+                writer.writerow([layout.ids[index], x, y, layout.orientations[index], layout.lengths[index]])
+
+    # ---- read-only views kept for the searches and heuristics ----
+    @property
+    def board_width(self):
+        return self.layout.board_width
+
+    @property
+    def board_height(self):
+        return self.layout.board_height
+
+    @property
+    def walls(self):
+        return list(self.layout.walls)
+
+    @property
+    def vehicles(self):
+        layout = self.layout
+        vehicles = []
+        for index, position in enumerate(self.positions):
+            x, y = layout.vehicleXY(index, position)
+            vehicles.append({"id": layout.ids[index], "x": x, "y": y,
+                             "orientation": layout.orientations[index], "length": layout.lengths[index]})
+        return vehicles
+
+    @property
+    def board(self):
+        if self._board is None:
+            self.setBoard()
+        return self._board
+
+    def flatBoard(self):
+        # row-major list of cells: ' ' for free, '#' for walls, the vehicle id otherwise
+        layout = self.layout
+        w = layout.board_width
+        cells = layout.emptyBoard[:]
+        for index, position in enumerate(self.positions):
+            x, y = layout.vehicleXY(index, position)
+            step = 1 if layout.orientations[index] == 'H' else w
+            start = y * w + x
+            cells[start:start + step * layout.lengths[index]:step] = [layout.ids[index]] * layout.lengths[index]
+        return cells
+
     def setBoard(self):
-        self.board = [[' ' for _ in range(self.board_width)] for _ in range(self.board_height)] 
-        for x, y in self.walls:
-            self.board[y][x] = '#'
-        for vehicle in self.vehicles:
-            x, y = vehicle["x"], vehicle["y"]
-            if vehicle["orientation"] == 'H':
-                for i in range(vehicle["length"]):
-                    self.board[y][x+i] = vehicle["id"]
-            else:
-                for i in range(vehicle["length"]):
-                    self.board[y+i][x] = vehicle["id"]         
+        w = self.layout.board_width
+        cells = self.flatBoard()
+        self._board = [cells[row:row + w] for row in range(0, len(cells), w)]
+        return self._board
+
+    def key(self):
+        # canonical hashable key of the state, the layout being shared
+        return self.positions
+
+    def pack(self):
+        # the offsets packed into one integer, see Layout.pack
+        return self.layout.pack(self.positions)
+
+    def __eq__(self, other):
+        # hashKey is compared first, positions resolve Zobrist collisions; states of
+        # different layouts never compare equal, even with the same offsets
+        return (isinstance(other, RushHourPuzzle) and self.hashKey == other.hashKey
+                and self.positions == other.positions and self.layout is other.layout)
+
+    def __hash__(self):
+        return self.hashKey
 
     @staticmethod
     def printRushHourBoard(board):
         str_line = '----------------------'
         printedBoard = f"{str_line}\n"+"".join(map(lambda line: " | ".join(map(str, line))+f"\n{str_line}\n", board))
         print(printedBoard)
-    
+
     # check if the red car is at the winning position
     def isGoal(self):
-        for vehicle in self.vehicles:
-            if vehicle["id"] == 'X' and vehicle["x"] == self.board_width-2:
-                return True
-        return False     
-    
+        layout = self.layout
+        if layout.xIndex is None:
+            return False
+        return layout.vehicleXY(layout.xIndex, self.positions[layout.xIndex])[0] == layout.board_width-2
+
+    def goalStates(self):
+        """
+        Generate every legal arrangement with car X at the exit in which the vehicles
+        sharing a lane keep their current order. Moves never change that order, so
+        this is a superset of the goal states of the component of self.
+        """
+        layout = self.layout
+        if layout.xIndex is None:
+            return
+        w = layout.board_width
+        occupied = bytearray(1 if cell == '#' else 0 for cell in layout.emptyBoard)
+        # vehicles placed earlier on the same lane, with their current order
+        lane_of = [(layout.orientations[i], layout.lanes[i]) for i in range(len(self.positions))]
+        order = sorted(range(len(self.positions)), key=lambda i: (i != layout.xIndex, lane_of[i], self.positions[i]))
+        positions = list(self.positions)
+
+        def cells(index, position):
+            if layout.orientations[index] == 'H':
+                start, step = layout.lanes[index] * w + position, 1
+            else:
+                start, step = position * w + layout.lanes[index], w
+            return range(start, start + step * layout.lengths[index], step)
+
+        def place(rank):
+            if rank == len(order):
+                yield RushHourPuzzle.fromPositions(layout, tuple(positions))
+                return
+            index = order[rank]
+            limit = w if layout.orientations[index] == 'H' else layout.board_height
+            if index == layout.xIndex:
+                candidates = [w - 2]
+            else:
+                lowest = 0
+                # the previous vehicle of the lane in `order` must stay before this one.
+                # X is placed first at w - 2 and takes no part in that order: the cars
+                # left of it in its row only have to fit in the cells left free.
+                previous = order[rank - 1]
+                if previous != layout.xIndex and lane_of[previous] == lane_of[index]:
+                    lowest = positions[previous] + layout.lengths[previous]
+                candidates = range(lowest, limit - layout.lengths[index] + 1)
+            for position in candidates:
+                covered = cells(index, position)
+                if any(occupied[cell] for cell in covered):
+                    continue
+                for cell in covered:
+                    occupied[cell] = 1
+                positions[index] = position
+                yield from place(rank + 1)
+                for cell in covered:
+                    occupied[cell] = 0
+
+        yield from place(0)
+
     # Generate the successors
-    def successorFunction(self):
+    def successorFunction(self, last_moves=0):
+        """
+        (action, successor) pairs of every single-cell move. With last_moves (see
+        Layout.redundant) the redundant moves are not generated.
+        """
         succs = list()
-        for index, vehicle in enumerate(self.vehicles):
-            x_position = vehicle["x"]
-            y_position = vehicle["y"]
-
-            # check if vehicle is oriented horizontally
-            if vehicle["orientation"] == 'H':
-                # move left if it's not on the edge of the board and it's not blocked by another vehicle
-                if x_position > 0 and self.board[y_position][x_position-1] == ' ':
-                    successor = deepcopy(self)
-                    successor.vehicles = deepcopy(self.vehicles)
-                    # update the vehicle's position
-                    successor.vehicles[index]["x"] = x_position-1
-                    # update the board
-                    successor.setBoard()
-                    succs.append(("{}:L".format(vehicle["id"]), successor))                    
-
-                # move right if it's not on the edge of the board and it's not blocked by another vehicle
-                if x_position + vehicle["length"] < self.board_width and self.board[y_position][x_position+vehicle["length"]] == ' ':
-                    successor = deepcopy(self)
-                    successor.vehicles = deepcopy(self.vehicles)
-                    # update the vehicle's position
-                    successor.vehicles[index]["x"] = x_position+1
-                    # update the board
-                    successor.setBoard()
-                    succs.append(("{}:R".format(vehicle["id"]), successor))                                
-
-            # check if vehicle is oriented vertically
-            else:
-                # move up if it's not on the edge of the board and it's not blocked by another vehicle
-                if y_position > 0 and self.board[y_position-1][x_position] == ' ':
-                    successor = deepcopy(self)
-                    successor.vehicles = deepcopy(self.vehicles)
-                    # update the vehicle's position
-                    successor.vehicles[index]["y"] = y_position-1
-                    # update the board
-                    successor.setBoard()
-                    succs.append(("{}:U".format(vehicle["id"]), successor))  
-                        
-                # move down if it's not on the edge of the board and it's not blocked by another vehicle    
-                if y_position + vehicle["length"] < self.board_height and self.board[y_position+vehicle["length"]][x_position] == ' ':
-                    successor = deepcopy(self)
-                    successor.vehicles = deepcopy(self.vehicles)
-                    # update the vehicle's position
-                    successor.vehicles[index]["y"] = y_position+1
-                    # update the board
-                    successor.setBoard()
-                    succs.append(("{}:D".format(vehicle["id"]), successor))  
+        layout = self.layout
+        rows, columns = layout.occupancy(self.positions)
+        positions = self.positions
+        for index, position in enumerate(positions):
+            length = layout.lengths[index]
+            zobrist = layout.zobrist[index]
+            # the hash of a successor only differs by the moved vehicle's two words
+            base_key = self.hashKey ^ zobrist[position]
+            # the vehicle's lane as the low bits: a row for 'H', a column for 'V'
+            lane = (rows if layout.orientations[index] == 'H' else columns) >> layout.laneShifts[index]
+
+            # move back if it's not on the edge of the board and it's not blocked by another vehicle
+            if position > 0 and not lane >> (position - 1) & 1 and not (
+                    last_moves and layout.redundant(positions, last_moves, index, -1)):
+                successor = RushHourPuzzle.fromPositions(layout, positions[:index] + (position-1,) + positions[index+1:],
+                                                         base_key ^ zobrist[position-1])
+                succs.append((layout.moveNames[index][0], successor))
+
+            # move forth if it's not on the edge of the board and it's not blocked by another vehicle
+            if position + length < layout.laneSizes[index] and not lane >> (position + length) & 1 and not (
+                    last_moves and layout.redundant(positions, last_moves, index, 1)):
+                successor = RushHourPuzzle.fromPositions(layout, positions[:index] + (position+1,) + positions[index+1:],
+                                                         base_key ^ zobrist[position+1])
+                succs.append((layout.moveNames[index][1], successor))
+        return succs
+
+    def macroSuccessors(self):
+        """
+        Macro-move action model: one action slides a vehicle any number of free cells
+        in one direction. Returns (action, successor, cells) triples, the action
+        being written "A:R3" for a slide of three cells to the right.
+        """
+        succs = list()
+        layout = self.layout
+        rows, columns = layout.occupancy(self.positions)
+        positions = self.positions
+        for index, position in enumerate(positions):
+            length = layout.lengths[index]
+            vehicle_id = layout.ids[index]
+            back, forth = layout.directions[index]
+            zobrist = layout.zobrist[index]
+            base_key = self.hashKey ^ zobrist[position]
+            lane = (rows if layout.orientations[index] == 'H' else columns) >> layout.laneShifts[index]
+            # free cells behind the vehicle: down to the highest occupied bit below it
+            behind = position - (lane & ((1 << position) - 1)).bit_length()
+            # free cells ahead: up to the lowest occupied bit past it, or the edge
+            ahead = lane >> (position + length)
+            room = layout.laneSizes[index] - position - length
+            ahead = min(room, (ahead & -ahead).bit_length() - 1) if ahead else room
+
+            for distance in range(1, behind + 1):
+                new_position = position - distance
+                successor = RushHourPuzzle.fromPositions(layout, positions[:index] + (new_position,) + positions[index+1:],
+                                                         base_key ^ zobrist[new_position])
+                succs.append(("{}:{}{}".format(vehicle_id, back, distance), successor, distance))
+            for distance in range(1, ahead + 1):
+                new_position = position + distance
+                successor = RushHourPuzzle.fromPositions(layout, positions[:index] + (new_position,) + positions[index+1:],
+                                                         base_key ^ zobrist[new_position])
+                succs.append(("{}:{}{}".format(vehicle_id, forth, distance), successor, distance))
         return succs
 
-    
-    
 
+class RushHourBoard:
+    """
+    Mutable working copy of a state for depth-first searches. A move is applied
+    in place as a two-cell delta on a flat board (the vacated cell is cleared and
+    the entered cell is filled) and can be undone, so move/unmove allocates nothing.
+    """
+
+    ACTIONS = {('H', -1): 'L', ('H', 1): 'R', ('V', -1): 'U', ('V', 1): 'D'}
 
+    def __init__(self, state):
+        self.layout = state.layout
+        self.positions = list(state.positions)
+        self.cells = state.flatBoard()
+        self.hashKey = state.hashKey
+        self.history = []
 
-    
-            
-                
+    @property
+    def board_width(self):
+        return self.layout.board_width
 
+    @property
+    def board_height(self):
+        return self.layout.board_height
 
+    def flatBoard(self):
+        # the live board, not a copy: callers must not modify it
+        return self.cells
+
+    def key(self):
+        return tuple(self.positions)
+
+    def toPuzzle(self):
+        return RushHourPuzzle.fromPositions(self.layout, tuple(self.positions), self.hashKey)
+
+    def isGoal(self):
+        layout = self.layout
+        if layout.xIndex is None:
+            return False
+        return layout.vehicleXY(layout.xIndex, self.positions[layout.xIndex])[0] == layout.board_width-2
 
+    def actionName(self, index, delta):
+        return "{}:{}".format(self.layout.ids[index], self.ACTIONS[(self.layout.orientations[index], delta)])
 
+    def _cellRange(self, index):
+        # first cell of the vehicle, distance between two of its cells, lane size
+        layout = self.layout
+        w = layout.board_width
+        if layout.orientations[index] == 'H':
+            return layout.lanes[index] * w + self.positions[index], 1, w
+        return self.positions[index] * w + layout.lanes[index], w, layout.board_height
 
+    def legalMoves(self, last_moves=0):
+        """(index, delta) of every legal move, without the redundant ones if last_moves is given."""
+        moves = []
+        cells = self.cells
+        for index, position in enumerate(self.positions):
+            length = self.layout.lengths[index]
+            start, step, limit = self._cellRange(index)
+            if position > 0 and cells[start - step] == ' ':
+                moves.append((index, -1))
+            if position + length < limit and cells[start + step * length] == ' ':
+                moves.append((index, 1))
+        if last_moves:
+            moves = [(index, delta) for index, delta in moves
+                     if not self.layout.redundant(self.positions, last_moves, index, delta)]
+        return moves
 
-    
+    def move(self, index, delta):
+        # slide vehicle `index` by one cell (delta = -1 or 1) without checking legality
+        length = self.layout.lengths[index]
+        start, step, _ = self._cellRange(index)
+        if delta > 0:
+            vacated, entered = start, start + step * length
+        else:
+            vacated, entered = start + step * (length - 1), start - step
+        self.cells[vacated] = ' '
+        self.cells[entered] = self.layout.ids[index]
+        zobrist = self.layout.zobrist[index]
+        self.hashKey ^= zobrist[self.positions[index]] ^ zobrist[self.positions[index] + delta]
+        self.positions[index] += delta
+        self.history.append((index, delta))
 
+    def undo(self):
+        index, delta = self.history.pop()
+        length = self.layout.lengths[index]
+        start, step, _ = self._cellRange(index)
+        # the cells swap roles compared to move()
+        if delta > 0:
+            vacated, entered = start + step * (length - 1), start - step
+        else:
+            vacated, entered = start, start + step * length
+        self.cells[vacated] = ' '
+        self.cells[entered] = self.layout.ids[index]
+        zobrist = self.layout.zobrist[index]
+        self.hashKey ^= zobrist[self.positions[index]] ^ zobrist[self.positions[index] - delta]
+        self.positions[index] -= delta
+        return index, delta
@@ -1,54 +1,234 @@
-from Nodebfs import Node
-from queue import Queue
+from nodepool import NodePool
+from retrograde import packedMoves
 from RushHourPuzzle import RushHourPuzzle
+from searchstats import SearchStats
 
 class Search:
 
     """ Uninformed/Blind Search """
     @staticmethod
-    def breadthFirst(initial_state):
-        
-        initial_node = Node(initial_state)   
+    def breadthFirst(initial_state, stats=None, macro=False, pruning=False):
+        """ With macro=True one action slides a vehicle any number of cells, and the
+        solution is optimal in number of slides. With pruning=True (single-cell moves)
+        redundant moves are not generated (see Layout.redundant). Each state in OPEN
+        keeps the set of last moves of all the shortest paths reaching it, and a move
+        is only pruned if it is redundant after every one of them. """
+        stats = stats if stats is not None else SearchStats()
+        pool = NodePool(initial_state.layout)
+        root = pool.add(initial_state.pack())
         # Check if the start element is the goal
-        if initial_node.state.isGoal():
-            return initial_node, 0
-
-        # Create the OPEN FIFO queue and the CLOSED list
-        open = Queue() # A FIFO queue
-        open.put(initial_node)
-        closed = list()
-       
-        explored_count = 0
-        while True:
-            print (f' explored_count {explored_count} ')
-            # Check if the OPEN queue is empty => goal not found 
-            if open.empty():
-                return None,  explored_count          
-            # Get the first element of the OPEN queue
-            current = open.get()            
-            # Put the current node in the CLOSED list
-            closed.append(current)
-            explored_count +=1 
+        if initial_state.isGoal():
+            return pool.node(root), 0
+
+        # The node pool itself is the OPEN FIFO queue: nodes are appended in generation
+        # order and expanded in that order. A single hashed set holds the packed keys of
+        # the states already seen (OPEN and CLOSED together).
+        seen = {pool.keys[root]}
+        current = 0
+        layout = initial_state.layout
+        pruning = pruning and not macro
+        # packed key -> (depth, bit set of last moves) for the states still in OPEN
+        last = {}
+
+        while current < len(pool):
+            stats.tick(len(pool) - current)
+            # Rebuild the state of the first node of the OPEN queue
+            state = pool.state(current)
+            g = pool.g[current] + 1
             # Generate the successors of the current node
-            for (action, successor) in current.state.successorFunction():                
-                child = Node(successor, current, action)
-                # Check if the child is not in the OPEN queue and the CLOSED list
-                if (child.state.board not in [node.state.board for node in closed] and \
-                    child.state.board not in [node.state.board for node in list(open.queue)]):
-                    # Check if the child is the goal
-                    if child.state.isGoal():
-                        print ("Goal reached")
-                        return child,  explored_count
-                    # Put the child in the OPEN queue 
-                    open.put(child)     
-            
+            if macro:
+                successors = [(action, successor) for action, successor, _ in state.macroSuccessors()]
+            elif pruning:
+                successors = state.successorFunction(last.pop(pool.keys[current], (0, 0))[1])
+            else:
+                successors = state.successorFunction()
+            for (action, successor) in successors:
+                stats.generated += 1
+                # Check if the child was not already generated
+                key = successor.pack()
+                if key in seen:
+                    stats.duplicates += 1
+                    # another shortest path to a state not yet expanded: remember its last move
+                    if pruning and key in last and last[key][0] == g:
+                        last[key] = (g, last[key][1] | 1 << layout.moveCodes[action])
+                    continue
+                seen.add(key)
+                if pruning:
+                    last[key] = (g, 1 << layout.moveCodes[action])
+                # Put the child in the OPEN queue
+                child = pool.add(key, current, action, g)
+                # Check if the child is the goal
+                if successor.isGoal():
+                    stats.finish()
+                    return pool.node(child), stats.expanded
+            current += 1
+        # OPEN queue is empty => goal not found
+        stats.finish()
+        return None,  stats.expanded
+
+    @staticmethod
+    def frontierBreadthFirst(initial_state, stats=None):
+        """
+        Layered frontier BFS: only the previous, current and next layers are kept, as
+        packed state keys. Moves are reversible, so every neighbour of a state of layer
+        d lies in layer d - 1, d or d + 1, and these three layers are enough to detect
+        all duplicates. Memory follows the widest layer instead of the component.
+        As no parent is kept, the path is rebuilt by divide and conquer: a search from
+        the start to the goal found at depth D, in which every state carries its
+        ancestor of depth D // 2, gives a middle state, and both halves are solved
+        the same way. Rebuilding runs one search per internal node of that recursion,
+        about D - 1 searches over O(log D) levels, all counted in stats.
+        """
+        stats = stats if stats is not None else SearchStats()
+        layout = initial_state.layout
+        successors, isGoal = packedMoves(layout)
+
+        def layered(start, isTarget, middle=None):
+            # (depth, target key, ancestor at depth `middle`) of the nearest target, or None
+            if isTarget(start):
+                return 0, start, start
+            previous, layer = {}, {start: start}
+            depth = 0
+            while layer:
+                next_layer = {}
+                for key, ancestor in layer.items():
+                    stats.tick(len(previous) + len(layer) + len(next_layer))
+                    for successor in successors(key):
+                        stats.generated += 1
+                        if successor in layer or successor in previous or successor in next_layer:
+                            stats.duplicates += 1
+                            continue
+                        carried = successor if depth + 1 == middle else ancestor
+                        if isTarget(successor):
+                            return depth + 1, successor, carried
+                        next_layer[successor] = carried
+                previous, layer = layer, next_layer
+                depth += 1
+            return None
+
+        def bridge(start, goal, depth):
+            # keys of a shortest path from start to goal, `depth` moves apart
+            if depth <= 1:
+                return [start, goal] if depth else [start]
+            half = depth // 2
+            _, _, middle = layered(start, lambda key: key == goal, half)
+            return bridge(start, middle, half)[:-1] + bridge(middle, goal, depth - half)
+
+        found = layered(initial_state.pack(), isGoal)
+        if found is None:
+            stats.finish()
+            return None, stats.expanded
+        depth, goal, _ = found
+        path = bridge(initial_state.pack(), goal, depth)
+        stats.finish()
+        return pathNode(layout, path), stats.expanded
+
+    @staticmethod
+    def bidirectional(initial_state, stats=None, max_goals=1 << 12):
+        """
+        Bidirectional breadth-first search on packed keys: a forward frontier grows
+        from the initial state and a backward frontier from the goal states, one whole
+        layer at a time, always on the smaller side. Moves are reversible, so the first
+        state generated by one side that the other side already holds lies on an
+        optimal path. goalStates() is a superset of the goals of the component, often
+        larger than the whole search, so it is only materialized once it has at most
+        max(max_goals, size of the forward frontier) states; until then "in the
+        backward set" simply means isGoal(). The backward side pays off on open boards
+        whose layers grow fast (bench/open-7x7.csv), not on the tightly packed 6x6
+        puzzles, where it never starts and the search is a plain BFS.
+        """
+        stats = stats if stats is not None else SearchStats()
+        layout = initial_state.layout
+        successors, isGoal = packedMoves(layout)
+        start = initial_state.pack()
+        if isGoal(start):
+            return pathNode(layout, [start]), 0
+
+        # key -> neighbour towards the root of its side, None for the roots
+        forward = {start: None}
+        forward_frontier = [start]
+        goal_states = initial_state.goalStates()
+        goals = []
+        backward = None
+        backward_frontier = None
+
+        meeting = None
+        while meeting is None and forward_frontier and (backward is None or backward_frontier):
+            if backward is None:
+                for goal in goal_states:
+                    goals.append(goal.pack())
+                    if len(goals) > max(max_goals, len(forward_frontier)):
+                        break
+                else:
+                    backward = dict.fromkeys(goals)
+                    backward_frontier = goals
+
+            forward_side = backward is None or len(forward_frontier) <= len(backward_frontier)
+            if forward_side:
+                side, other, frontier = forward, backward, forward_frontier
+            else:
+                side, other, frontier = backward, forward, backward_frontier
+            next_frontier = []
+            for key in frontier:
+                stats.tick(len(forward_frontier) + len(goals if backward is None else backward_frontier))
+                for successor in successors(key):
+                    stats.generated += 1
+                    if successor in side:
+                        stats.duplicates += 1
+                        continue
+                    side[successor] = key
+                    if isGoal(successor) if other is None else successor in other:
+                        meeting = successor
+                        break
+                    next_frontier.append(successor)
+                if meeting is not None:
+                    break
+            if forward_side:
+                forward_frontier = next_frontier
+            else:
+                backward_frontier = next_frontier
+
+        stats.finish()
+        if meeting is None:
+            return None, stats.expanded
+
+        # Rebuild the path: forward half from the root, then the backward half to a goal
+        path = []
+        key = meeting
+        while key is not None:
+            path.append(key)
+            key = forward[key]
+        path.reverse()
+        key = backward[meeting] if backward is not None else None
+        while key is not None:
+            path.append(key)
+            key = backward[key]
+        return pathNode(layout, path), stats.expanded
+
+
+def pathNode(layout, path):
+    """Node chain of a path of packed keys: each action is the one vehicle whose offset changed."""
+    pool = NodePool(layout)
+    node = pool.add(path[0])
+    before = layout.unpack(path[0])
+    for g, key in enumerate(path[1:], 1):
+        after = layout.unpack(key)
+        index = next(i for i, (a, b) in enumerate(zip(before, after)) if a != b)
+        action = layout.moveNames[index][after[index] > before[index]]
+        node = pool.add(key, node, action, g)
+        before = after
+    return pool.node(node)
+
+
 def main():
 
     initial_state = RushHourPuzzle('2-b.csv')
     RushHourPuzzle.printRushHourBoard(initial_state.board)   
-    goal_node, explored_count = Search.breadthFirst(initial_state)
+    stats = SearchStats()
+    goal_node, explored_count = Search.breadthFirst(initial_state, stats)
     print(f"Path cost: {goal_node.g}")
     print(f"Number of explored_counts: {explored_count}")
+    print(f"Stats: {stats.summary()}")
     print("Moves: {}".format(" ".join(map(str, goal_node.getSolution()))))
 
 if __name__ == "__main__":
@@ -0,0 +1,128 @@
+import argparse
+import glob
+import json
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from bundle import PuzzleBundle
+from RushHourPuzzle import RushHourPuzzle
+from searchstats import SearchStats
+from solutioncache import SolutionCache
+from utils import runSolver, solutionMoves
+
+
+def collectPuzzles(patterns):
+    """
+    Expand directories and glob patterns into a sorted list of CSV files. A bundle
+    (.rhb, see bundle.py) stands for all its puzzles, referenced as "bundle#index".
+    """
+    files = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, "*.csv")
+        files.extend(glob.glob(pattern))
+    puzzles = []
+    for path in sorted(set(files)):
+        if path.endswith(".rhb"):
+            with PuzzleBundle(path) as bundle:
+                puzzles.extend(f"{path}#{index}" for index in range(len(bundle)))
+        else:
+            puzzles.append(path)
+    return puzzles
+
+
+# bundles opened by this worker process, kept mapped for the following puzzles
+_bundles = {}
+
+
+def loadPuzzle(reference):
+    """Load a CSV file or a "bundle#index" reference."""
+    path, _, index = reference.rpartition("#")
+    if not path.endswith(".rhb"):
+        return RushHourPuzzle(reference)
+    if path not in _bundles:
+        _bundles[path] = PuzzleBundle(path)
+    return _bundles[path][int(index)]
+
+
+def _timeout(signum, frame):
+    raise TimeoutError
+
+
+def solvePuzzle(csv_file, algorithm, heuristic, timeout, tt_size=0, cache_path=None):
+    """Solve one puzzle in a worker process and return its result record."""
+    result = {"puzzle": csv_file, "algorithm": algorithm}
+    if algorithm in ("astar", "idastar"):
+        result["heuristic"] = heuristic
+    # SIGALRM interrupts the search itself, so a worker is never stuck on one puzzle
+    use_alarm = timeout and hasattr(signal, "setitimer")
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    start = time.perf_counter()
+    try:
+        state = loadPuzzle(csv_file)
+        if cache_path:
+            cache = SolutionCache(cache_path)
+            try:
+                moves, stats, hit = cache.solve(state, algorithm, heuristic, tt_size)
+            finally:
+                cache.close()
+            result["cached"] = hit
+        else:
+            stats = SearchStats()
+            goal_node, _ = runSolver(algorithm, state, heuristic, tt_size, stats)
+            moves = solutionMoves(goal_node) if goal_node is not None else None
+            stats = stats.asDict()
+        if moves is None:
+            result.update(status="unsolvable", expanded=stats["expanded"], stats=stats)
+        else:
+            result.update(status="solved", moves=moves, cost=len(moves), expanded=stats["expanded"], stats=stats)
+    except TimeoutError:
+        result["status"] = "timeout"
+    except Exception as error:
+        result.update(status="error", error=repr(error))
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    result["time"] = round(time.perf_counter() - start, 6)
+    return result
+
+
+def solveBatch(files, algorithm="astar", heuristic=4, timeout=None, workers=None, tt_size=0, cache_path=None):
+    """Yield the result records in completion order while the pool keeps working."""
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(solvePuzzle, csv_file, algorithm, heuristic, timeout, tt_size, cache_path) for csv_file in files]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve many Rush Hour CSV puzzles in parallel.")
+    parser.add_argument("puzzles", nargs="+", help="CSV files, bundles, directories or glob patterns")
+    parser.add_argument("-a", "--algorithm", default="astar", choices=["bfs", "bidirectional", "astar", "idastar"])
+    parser.add_argument("--heuristic", type=int, default=4, help="heuristic of astar/idastar (1-4)")
+    parser.add_argument("--tt-size", type=int, default=100000, help="idastar transposition table size")
+    parser.add_argument("-t", "--timeout", type=float, default=None, help="seconds allowed per puzzle")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--cache", default=None, help="sqlite solution cache shared by the workers")
+    parser.add_argument("-o", "--output", default="-", help="JSON Lines output file (default: stdout)")
+    args = parser.parse_args()
+
+    files = collectPuzzles(args.puzzles)
+    out = sys.stdout if args.output == "-" else open(args.output, "w")
+    try:
+        for result in solveBatch(files, args.algorithm, args.heuristic, args.timeout, args.workers, args.tt_size,
+                                 args.cache):
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+from RushHourPuzzle import RushHourPuzzle
+from batch import collectPuzzles
+from searchstats import SearchStats
+from utils import HERE, runSolver, solutionMoves
+
+# name -> keyword arguments of utils.runSolver
+ALGORITHMS = {
+    "bfs": {"algorithm": "bfs"},
+    "bfs-pruned": {"algorithm": "bfs", "pruning": True},
+    "bfs-frontier": {"algorithm": "frontier"},
+    "bidirectional": {"algorithm": "bidirectional"},
+    "astar-h1": {"algorithm": "astar", "heuristic": 1},
+    "astar-h2": {"algorithm": "astar", "heuristic": 2},
+    "astar-h3": {"algorithm": "astar", "heuristic": 3},
+    "astar-h4": {"algorithm": "astar", "heuristic": 4},
+    "astar-h4-pruned": {"algorithm": "astar", "heuristic": 4, "pruning": True},
+    "wastar-h4-w2": {"algorithm": "astar", "heuristic": 4, "weight": 2},
+    "arastar-h4": {"algorithm": "arastar", "heuristic": 4},
+    "idastar-h4": {"algorithm": "idastar", "heuristic": 4, "tt_size": 100000},
+    "hdastar-h4": {"algorithm": "hdastar", "heuristic": 4},
+}
+DEFAULT_ALGORITHMS = ["bfs", "bidirectional", "astar-h1", "astar-h2", "astar-h3", "astar-h4"]
+# algorithms whose solutions may be longer than the optimum
+INEXACT = {"wastar-h4-w2"}
+DEFAULT_PUZZLES = [HERE, os.path.join(HERE, "bench")]
+# metrics compared against a baseline, all of them "lower is better"
+METRICS = ["time", "expanded", "peak_memory"]
+
+
+def runOnce(csv_file, options, trace=False):
+    state = RushHourPuzzle(csv_file)
+    stats = SearchStats()
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    goal_node, _ = runSolver(state=state, stats=stats, **options)
+    elapsed = time.perf_counter() - start
+    peak = None
+    if trace:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    length = len(solutionMoves(goal_node)) if goal_node is not None else None
+    return elapsed, peak, stats, length
+
+
+def benchmark(files, algorithms, repeat=1, memory=True, progress=None):
+    """
+    Run every algorithm on every puzzle. The time is the best of `repeat` untraced
+    runs; the peak memory comes from one extra run under tracemalloc, whose
+    overhead would otherwise distort the timings.
+    """
+    results = []
+    for csv_file in files:
+        for name in algorithms:
+            options = ALGORITHMS[name]
+            times = []
+            for _ in range(repeat):
+                elapsed, _, stats, length = runOnce(csv_file, options)
+                times.append(elapsed)
+            peak = runOnce(csv_file, options, trace=True)[1] if memory else None
+            result = {"puzzle": os.path.relpath(csv_file, HERE), "algorithm": name, "time": round(min(times), 6),
+                      "expanded": stats.expanded, "generated": stats.generated, "peak_memory": peak,
+                      "length": length}
+            results.append(result)
+            if progress is not None:
+                progress(result)
+    return results
+
+
+def mismatches(results):
+    """
+    Return the results of the exact algorithms whose solution length differs from
+    the first exact result on the same puzzle (None meaning no solution found).
+    """
+    reference = {}
+    wrong = []
+    for result in results:
+        if result["algorithm"] in INEXACT:
+            continue
+        expected = reference.setdefault(result["puzzle"], result)
+        if result["length"] != expected["length"]:
+            wrong.append((result, expected))
+    return wrong
+
+
+def compare(results, baseline, threshold):
+    """
+    Return the regressions of results against a baseline report: a metric more than
+    `threshold` (a fraction) above its baseline value, or a different solution length.
+    """
+    previous = {(r["puzzle"], r["algorithm"]): r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        old = previous.get((result["puzzle"], result["algorithm"]))
+        if old is None:
+            continue
+        for metric in METRICS:
+            if result[metric] is None or not old.get(metric):
+                continue
+            ratio = result[metric] / old[metric]
+            if ratio > 1 + threshold:
+                regressions.append({"puzzle": result["puzzle"], "algorithm": result["algorithm"], "metric": metric,
+                                    "baseline": old[metric], "value": result[metric], "ratio": round(ratio, 3)})
+        if result["length"] != old["length"]:
+            regressions.append({"puzzle": result["puzzle"], "algorithm": result["algorithm"], "metric": "length",
+                                "baseline": old["length"], "value": result["length"], "ratio": None})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Rush Hour solvers.")
+    parser.add_argument("puzzles", nargs="*", help="CSV files, directories or globs (default: bundled and bench/)")
+    parser.add_argument("-a", "--algorithms", default=",".join(DEFAULT_ALGORITHMS),
+                        help="comma separated, among: " + ", ".join(ALGORITHMS))
+    parser.add_argument("-r", "--repeat", type=int, default=1, help="timed runs per case, the best is kept")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc run")
+    parser.add_argument("-o", "--output", default="benchmark.json", help="JSON report to write")
+    parser.add_argument("--compare", help="baseline report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown fraction (default 0.2)")
+    args = parser.parse_args()
+
+    files = collectPuzzles(args.puzzles or DEFAULT_PUZZLES)
+    algorithms = args.algorithms.split(",")
+    width = max(map(len, algorithms))
+
+    def show(result):
+        memory = f"{result['peak_memory'] / 1e6:8.2f} MB" if result["peak_memory"] is not None else ""
+        print(f"{result['puzzle']:28} {result['algorithm']:{width}} {result['time']:9.3f}s "
+              f"{result['expanded']:9} nodes  length {result['length']}  {memory}", flush=True)
+
+    results = benchmark(files, algorithms, args.repeat, not args.no_memory, show)
+    report = {"meta": {"date": datetime.datetime.now().isoformat(timespec="seconds"),
+                       "python": platform.python_version(), "platform": platform.platform()},
+              "results": results}
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=1)
+
+    wrong = mismatches(results)
+    for result, expected in wrong:
+        print(f"MISMATCH {result['puzzle']} {result['algorithm']}: length {result['length']}, "
+              f"{expected['algorithm']} found {expected['length']}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for regression in regressions:
+            print("REGRESSION {puzzle} {algorithm} {metric}: {baseline} -> {value}".format(**regression))
+        if regressions:
+            sys.exit(1)
+        print("No regression.")
+    if wrong:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+import argparse
+import glob
+import mmap
+import os
+import struct
+from collections import OrderedDict
+
+from RushHourPuzzle import Layout, RushHourPuzzle
+
+MAGIC = b"RHPB"
+VERSION = 2
+# magic, version, puzzle count, offset of the index
+HEADER = struct.Struct("<4sHIQ")
+# width, height, wall count, vehicle count, name length in bytes
+RECORD = struct.Struct("<BBBBH")
+# x, y
+WALL = struct.Struct("<BB")
+# id length in bytes, x, y, orientation, length: the fields of a CSV vehicle line,
+# the id itself following like the record name does
+VEHICLE = struct.Struct("<BBBcB")
+OFFSET = struct.Struct("<Q")
+
+
+def writeBundle(path, puzzles):
+    """
+    Write (name, RushHourPuzzle) pairs into one bundle file and return their count.
+    Each record is a fixed header, the name, then one fixed-width entry per wall
+    and one per vehicle followed by its id; the index of record offsets is written after the records, so
+    puzzles are streamed without knowing their count in advance.
+    """
+    offsets = []
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, 0))
+        for name, puzzle in puzzles:
+            layout = puzzle.layout
+            name = name.encode()
+            offsets.append(f.tell())
+            record = bytearray(RECORD.pack(layout.board_width, layout.board_height, len(layout.walls),
+                                           len(layout.ids), len(name)))
+            record += name
+            for x, y in layout.walls:
+                record += WALL.pack(x, y)
+            for index, position in enumerate(puzzle.positions):
+                x, y = layout.vehicleXY(index, position)
+                vehicle_id = layout.ids[index].encode()
+                record += VEHICLE.pack(len(vehicle_id), x, y, layout.orientations[index].encode(),
+                                       layout.lengths[index])
+                record += vehicle_id
+            f.write(record)
+        index_offset = f.tell()
+        for offset in offsets:
+            f.write(OFFSET.pack(offset))
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, len(offsets), index_offset))
+    return len(offsets)
+
+
+class PuzzleBundle:
+    """
+    Read-only view of a bundle file through mmap: opening it only reads the header,
+    and each puzzle is decoded from a memoryview of its record when it is asked for.
+    Puzzles with the same static part (board, walls, vehicle ids, orientations,
+    lengths and lanes) share one Layout, kept in an LRU cache of at most
+    layout_cache layouts so that a bundle of distinct layouts does not pin them all.
+    """
+
+    def __init__(self, path, layout_cache=1024):
+        self.path = path
+        self.file = open(path, "rb")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.data)
+        magic, version, self.count, self.indexOffset = HEADER.unpack_from(self.view)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a puzzle bundle")
+        self.layouts = OrderedDict()
+        self.layoutCache = layout_cache
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        return self.read(index)[1]
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield self.read(index)[1]
+
+    def items(self):
+        """(name, puzzle) pairs in file order."""
+        for index in range(self.count):
+            yield self.read(index)
+
+    def name(self, index):
+        offset = self.offset(index)
+        name_length = RECORD.unpack_from(self.view, offset)[4]
+        start = offset + RECORD.size
+        return str(self.view[start:start + name_length], "utf-8")
+
+    def offset(self, index):
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        return OFFSET.unpack_from(self.view, self.indexOffset + index * OFFSET.size)[0]
+
+    def read(self, index):
+        """Decode record `index` into (name, RushHourPuzzle)."""
+        offset = self.offset(index)
+        view = self.view
+        w, h, wall_count, vehicle_count, name_length = RECORD.unpack_from(view, offset)
+        offset += RECORD.size
+        name = str(view[offset:offset + name_length], "utf-8")
+        offset += name_length
+        end = offset + wall_count * WALL.size
+        walls = tuple(WALL.iter_unpack(view[offset:end]))
+        offset = end
+        vehicles = []
+        for _ in range(vehicle_count):
+            id_length, x, y, orientation, length = VEHICLE.unpack_from(view, offset)
+            offset += VEHICLE.size
+            vehicles.append((str(view[offset:offset + id_length], "utf-8"), x, y, orientation, length))
+            offset += id_length
+        vehicles = tuple(vehicles)
+
+        lanes, positions = [], []
+        for _, x, y, orientation, _ in vehicles:
+            if orientation == b'H':
+                lanes.append(y)
+                positions.append(x)
+            else:
+                lanes.append(x)
+                positions.append(y)
+        signature = (w, h, walls, tuple((vehicle_id, orientation, length) for vehicle_id, _, _, orientation, length
+                                        in vehicles), tuple(lanes))
+        layout = self.layouts.get(signature)
+        if layout is None:
+            layout = Layout(w, h, walls, [vehicle[0] for vehicle in vehicles],
+                            [vehicle[3].decode() for vehicle in vehicles], [vehicle[4] for vehicle in vehicles], lanes)
+            self.layouts[signature] = layout
+            if len(self.layouts) > self.layoutCache:
+                self.layouts.popitem(last=False)
+        else:
+            self.layouts.move_to_end(signature)
+        return name, RushHourPuzzle.fromPositions(layout, tuple(positions))
+
+    def close(self):
+        self.view.release()
+        self.data.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack Rush Hour CSV puzzles into a binary bundle and back.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    pack = commands.add_parser("pack", help="convert CSV files into a bundle")
+    pack.add_argument("bundle")
+    pack.add_argument("puzzles", nargs="+", help="CSV files, directories or glob patterns")
+    unpack = commands.add_parser("unpack", help="write the puzzles of a bundle back as CSV files")
+    unpack.add_argument("bundle")
+    unpack.add_argument("directory")
+    listing = commands.add_parser("list", help="print the name and vehicle count of each puzzle")
+    listing.add_argument("bundle")
+    args = parser.parse_args()
+
+    if args.command == "pack":
+        files = []
+        for pattern in args.puzzles:
+            if os.path.isdir(pattern):
+                pattern = os.path.join(pattern, "*.csv")
+            files.extend(glob.glob(pattern))
+        count = writeBundle(args.bundle, ((csv_file, RushHourPuzzle(csv_file)) for csv_file in sorted(set(files))))
+        print(f"{count} puzzles written to {args.bundle}")
+    else:
+        with PuzzleBundle(args.bundle) as bundle:
+            for name, puzzle in bundle.items():
+                if args.command == "list":
+                    print(f"{name}: {puzzle.board_width}x{puzzle.board_height}, {len(puzzle.positions)} vehicles")
+                else:
+                    os.makedirs(args.directory, exist_ok=True)
+                    puzzle.saveCsv(os.path.join(args.directory, os.path.basename(name)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+import argparse
+import heapq
+import json
+import mmap
+import os
+
+from RushHourPuzzle import RushHourPuzzle
+from retrograde import packedMoves
+from searchstats import SearchStats
+
+
+class KeyFile:
+    """
+    Sorted binary file of packed states (Layout.pack), each stored big-endian on a
+    fixed number of bytes, so that byte order is numeric order. It is read through
+    mmap: streaming reads and binary searches never load the file in memory.
+    """
+
+    def __init__(self, path, width):
+        self.path = path
+        self.width = width
+
+    def __len__(self):
+        return os.path.getsize(self.path) // self.width
+
+    def __iter__(self):
+        width = self.width
+        with open(self.path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                for offset in range(0, len(data), width):
+                    yield int.from_bytes(data[offset:offset + width], "big")
+
+    def __contains__(self, key):
+        width = self.width
+        target = key.to_bytes(width, "big")
+        with open(self.path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return False
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                low, high = 0, len(data) // width
+                while low < high:
+                    middle = (low + high) // 2
+                    record = data[middle * width:(middle + 1) * width]
+                    if record < target:
+                        low = middle + 1
+                    elif record > target:
+                        high = middle
+                    else:
+                        return True
+        return False
+
+    @classmethod
+    def write(cls, path, keys, width):
+        """Write an already sorted stream of keys; returns the KeyFile."""
+        with open(path, "wb") as f:
+            buffer = bytearray()
+            for key in keys:
+                buffer += key.to_bytes(width, "big")
+                if len(buffer) >= 1 << 20:
+                    f.write(buffer)
+                    buffer.clear()
+            f.write(buffer)
+        return cls(path, width)
+
+
+def unique(keys):
+    """Drop the repeats of a sorted stream."""
+    previous = None
+    for key in keys:
+        if key != previous:
+            yield key
+            previous = key
+
+
+def difference(keys, *excluded):
+    """Keys of a sorted stream that are in none of the sorted `excluded` streams."""
+    excluded = unique(heapq.merge(*excluded))
+    other = next(excluded, None)
+    for key in keys:
+        while other is not None and other < key:
+            other = next(excluded, None)
+        if key != other:
+            yield key
+
+
+class RunWriter:
+    """
+    Collects keys in memory up to chunk_size, then spills them to disk as a sorted
+    run without repeats. merge() streams the union of the runs in order.
+    """
+
+    def __init__(self, directory, prefix, width, chunk_size):
+        self.directory = directory
+        self.prefix = prefix
+        self.width = width
+        self.chunk_size = chunk_size
+        self.buffer = set()
+        self.runs = []
+
+    def add(self, key):
+        self.buffer.add(key)
+        if len(self.buffer) >= self.chunk_size:
+            self.spill()
+
+    def spill(self):
+        if self.buffer:
+            path = os.path.join(self.directory, f"{self.prefix}-run{len(self.runs):04d}.bin")
+            self.runs.append(KeyFile.write(path, sorted(self.buffer), self.width))
+            self.buffer = set()
+
+    def merge(self):
+        self.spill()
+        return unique(heapq.merge(*self.runs))
+
+    def remove(self):
+        for run in self.runs:
+            os.remove(run.path)
+        self.runs = []
+
+
+class ExternalBFS:
+    """
+    Breadth-first enumeration with delayed duplicate detection on disk: each layer
+    is a sorted KeyFile. Layer d + 1 is built by streaming the successors of layer d
+    into sorted runs of at most chunk_size keys, merging the runs and removing, in
+    the same streaming pass, the keys of layers d and d - 1 (moves are reversible,
+    so no other layer can hold a neighbour). Memory is bounded by chunk_size and
+    the number of runs, the layers only need local disk.
+    """
+
+    def __init__(self, layout, directory, chunk_size=1 << 20, stats=None):
+        self.layout = layout
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.stats = stats if stats is not None else SearchStats()
+        self.width = (layout.packBits * len(layout.ids) + 7) // 8
+        self.successors, self.isGoal = packedMoves(layout)
+        self.layers = []
+        os.makedirs(directory, exist_ok=True)
+
+    def layerPath(self, depth):
+        return os.path.join(self.directory, f"layer-{depth:04d}.bin")
+
+    def run(self, seeds, max_depth=None):
+        """Enumerate from the seed states (RushHourPuzzle) and return the layer sizes."""
+        writer = RunWriter(self.directory, "layer-0000", self.width, self.chunk_size)
+        for state in seeds:
+            writer.add(state.pack())
+        self.layers = [KeyFile.write(self.layerPath(0), writer.merge(), self.width)]
+        writer.remove()
+        while len(self.layers[-1]) and (max_depth is None or len(self.layers) <= max_depth):
+            depth = len(self.layers)
+            writer = RunWriter(self.directory, f"layer-{depth:04d}", self.width, self.chunk_size)
+            # the length of a KeyFile is a stat of its file: read it once per layer
+            open_size = len(self.layers[-1])
+            for key in self.layers[-1]:
+                self.stats.tick(open_size)
+                for successor in self.successors(key):
+                    self.stats.generated += 1
+                    writer.add(successor)
+            previous = self.layers[-2:]
+            self.layers.append(KeyFile.write(self.layerPath(depth), difference(writer.merge(), *previous), self.width))
+            writer.remove()
+        if not len(self.layers[-1]):
+            # the last layer is empty: the enumeration is complete
+            os.remove(self.layers.pop().path)
+        self.stats.finish()
+        return self.histogram()
+
+    def histogram(self):
+        return [len(layer) for layer in self.layers]
+
+    def depth(self, state):
+        """Layer holding a state, or None; one binary search per layer."""
+        key = state.pack()
+        for depth, layer in enumerate(self.layers):
+            if key in layer:
+                return depth
+        return None
+
+    def hardest(self, count=None):
+        """States of the last layer, at most count of them."""
+        states = []
+        for key in self.layers[-1]:
+            if count is not None and len(states) == count:
+                break
+            states.append(RushHourPuzzle.fromPositions(self.layout, self.layout.unpack(key)))
+        return states
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exhaustive disk-based BFS of a Rush Hour state space.")
+    parser.add_argument("csv_file")
+    parser.add_argument("--from", dest="origin", choices=["goals", "start"], default="goals",
+                        help="seed with every goal arrangement keeping the lane orders of the CSV (distances to "
+                             "the goal), or with the CSV state only (its component, distances from it)")
+    parser.add_argument("-d", "--directory", default="layers", help="where the layer files are written")
+    parser.add_argument("--chunk-size", type=int, default=1 << 20, help="keys sorted in memory before a spill")
+    parser.add_argument("--max-depth", type=int, default=None)
+    parser.add_argument("--hardest", type=int, default=10, help="states of the last layer written as CSV")
+    args = parser.parse_args()
+
+    puzzle = RushHourPuzzle(args.csv_file)
+    search = ExternalBFS(puzzle.layout, args.directory, args.chunk_size)
+    seeds = puzzle.goalStates() if args.origin == "goals" else [puzzle]
+    histogram = search.run(seeds, args.max_depth)
+    total = sum(histogram)
+    print(f"States: {total}, layers: {len(histogram)}, max depth: {len(histogram) - 1}")
+    for depth, size in enumerate(histogram):
+        print(f"{depth:4} {size}")
+    print(f"Depth of the CSV state: {search.depth(puzzle)}")
+
+    hardest = search.hardest(args.hardest)
+    for number, state in enumerate(hardest):
+        state.saveCsv(os.path.join(args.directory, f"hardest-{number:04d}.csv"))
+    with open(os.path.join(args.directory, "summary.json"), "w") as f:
+        json.dump({"puzzle": args.csv_file, "from": args.origin, "states": total, "histogram": histogram,
+                   "hardest": [os.path.join(args.directory, f"hardest-{n:04d}.csv") for n in range(len(hardest))],
+                   "stats": search.stats.asDict()}, f, indent=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import argparse
+import os
+import random
+import string
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from RushHourPuzzle import Layout, RushHourPuzzle
+from retrograde import DistanceTable
+from solutioncache import SolutionCache
+
+# ids given to the vehicles other than car X, in placement order: enough single
+# characters for the 61 vehicles of a crowded 12x12 board
+VEHICLE_IDS = [c for c in string.ascii_uppercase + string.ascii_lowercase + string.digits if c != 'X']
+
+
+def randomLayout(rng, width=6, height=6, vehicles=12, walls=0, truck_ratio=0.25):
+    """
+    Random legal start state: car X on the exit row plus up to vehicles - 1 cars and
+    trucks placed without overlap. Walls are never put on the exit row, which would
+    make the puzzle unsolvable. Returns None if no vehicle fits besides X.
+    """
+    row = (height - 1) // 2
+    occupied = set()
+    wall_cells = []
+    while len(wall_cells) < walls:
+        cell = (rng.randrange(width), rng.randrange(height))
+        if cell[1] != row and cell not in occupied:
+            occupied.add(cell)
+            wall_cells.append(cell)
+
+    x = rng.randrange(width - 2)
+    occupied.update(((x, row), (x + 1, row)))
+    ids, orientations, lengths, lanes, positions = ['X'], ['H'], [2], [row], [x]
+    for _ in range(20 * vehicles):
+        if len(ids) == min(vehicles, len(VEHICLE_IDS) + 1):
+            break
+        orientation = rng.choice('HV')
+        length = 3 if rng.random() < truck_ratio else 2
+        size = width if orientation == 'H' else height
+        lane = rng.randrange(height if orientation == 'H' else width)
+        # a horizontal vehicle on the exit row could never let X out
+        if length > size or (orientation == 'H' and lane == row):
+            continue
+        position = rng.randrange(size - length + 1)
+        if orientation == 'H':
+            cells = [(position + i, lane) for i in range(length)]
+        else:
+            cells = [(lane, position + i) for i in range(length)]
+        if occupied.intersection(cells):
+            continue
+        occupied.update(cells)
+        ids.append(VEHICLE_IDS[len(ids) - 1])
+        orientations.append(orientation)
+        lengths.append(length)
+        lanes.append(lane)
+        positions.append(position)
+    if len(ids) == 1:
+        return None
+    layout = Layout(width, height, wall_cells, ids, orientations, lengths, lanes)
+    return RushHourPuzzle.fromPositions(layout, tuple(positions))
+
+
+def hardestStates(seed, width=6, height=6, vehicles=12, walls=0, min_moves=20, max_states=20000, per_layout=1,
+                  attempts=200):
+    """
+    Worker task: draw random layouts until one has a component of at most max_states
+    states whose farthest states need at least min_moves moves. The distances come
+    from a backward BFS started at every goal state of the component (DistanceTable),
+    which is skipped when the enumeration already shows that no state can need
+    min_moves moves. Returns (moves, component size, layout dict, list of positions),
+    or None if all attempts failed.
+    """
+    rng = random.Random(seed)
+    for _ in range(attempts):
+        state = randomLayout(rng, width, height, vehicles, walls)
+        if state is None or state.layout.packBits * len(state.layout.ids) > 64:
+            continue
+        table = DistanceTable.build(state, max_states, min_moves)
+        if table is None:
+            continue
+        moves, ranks = table.farthest()
+        if moves is None or moves < min_moves:
+            continue
+        layout = table.layout
+        chosen = ranks if len(ranks) <= per_layout else rng.sample(ranks, per_layout)
+        return moves, len(table), layout.toDict(), [layout.unpack(table.keys[rank]) for rank in chosen]
+    return None
+
+
+def generate(count, seed=0, workers=None, **options):
+    """
+    Yield (moves, component size, puzzle) until count distinct puzzles were produced.
+    Every task gets its own seed, so the output only depends on seed and the options.
+    Measured with one worker: about 75-85 puzzles of 20+ moves per minute at the
+    defaults (6x6, 12 vehicles, max_states=20000). Most of the time goes to layouts
+    whose component exceeds max_states, which are only known once max_states states
+    were enumerated; at 8x8 with 16 vehicles and 3 walls nearly all layouts are
+    such, and no puzzle came out in 4 minutes. A lower max_states or denser layouts
+    raise the rate, which then grows with the number of workers.
+    """
+    seen = set()
+    produced = 0
+    next_seed = seed
+    workers = workers or os.cpu_count()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        # keep a couple of tasks per worker in flight and stop submitting once done
+        while produced < count:
+            while len(pending) < 2 * workers:
+                pending.add(pool.submit(hardestStates, next_seed, **options))
+                next_seed += 1
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                if result is None:
+                    continue
+                moves, size, layout_dict, all_positions = result
+                layout = Layout.fromDict(layout_dict)
+                for positions in all_positions:
+                    puzzle = RushHourPuzzle.fromPositions(layout, tuple(positions))
+                    description = SolutionCache.canonicalForm(puzzle)[0]
+                    if description in seen or produced == count:
+                        continue
+                    seen.add(description)
+                    produced += 1
+                    yield moves, size, puzzle
+        for future in pending:
+            future.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate hard Rush Hour puzzles as CSV files.")
+    parser.add_argument("-n", "--count", type=int, default=100, help="number of puzzles to write")
+    parser.add_argument("-m", "--moves", type=int, default=20, help="minimum optimal solution length")
+    parser.add_argument("-v", "--vehicles", type=int, default=12, help="vehicles per layout, car X included")
+    parser.add_argument("-w", "--walls", type=int, default=0, help="walls per layout")
+    parser.add_argument("--size", default="6x6", help="board size as WIDTHxHEIGHT")
+    parser.add_argument("--max-states", type=int, default=20000, help="skip layouts with larger components")
+    parser.add_argument("--per-layout", type=int, default=1, help="farthest states kept per layout")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-j", "--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("-o", "--output", default="generated", help="directory of the CSV files")
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.lower().split("x"))
+    os.makedirs(args.output, exist_ok=True)
+    generated = generate(args.count, args.seed, args.workers, width=width, height=height, vehicles=args.vehicles,
+                         walls=args.walls, min_moves=args.moves, max_states=args.max_states,
+                         per_layout=args.per_layout)
+    for number, (moves, size, puzzle) in enumerate(generated):
+        csv_file = os.path.join(args.output, f"{width}x{height}-{moves}-{number:05d}.csv")
+        puzzle.saveCsv(csv_file)
+        print(f"{csv_file}: {moves} moves, component of {size} states", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+import argparse
+import heapq
+import math
+import multiprocessing
+import time
+from queue import Empty
+
+from nodeaetoile import HEURISTICS, Node, heuristic1
+from RushHourPuzzle import Layout, RushHourPuzzle
+from searchstats import SearchStats
+
+# messages sent to a worker inbox
+BATCH, INCUMBENT, PROBE, TRACE, STOP = "batch", "incumbent", "probe", "trace", "stop"
+# messages sent to the coordinator
+FOUND, STATUS, PARENT, DONE = "found", "status", "parent", "done"
+
+
+def owner(state, workers):
+    """Worker that holds a state: its Zobrist hash modulo the number of workers."""
+    return state.hashKey % workers
+
+
+def worker(index, workers, layout_dict, heuristic, inboxes, results, batch_size):
+    """
+    One HDA* worker. It owns the states whose hash falls on its index and keeps
+    their OPEN heap and best g / parent table. Successors owned by another worker
+    are buffered per destination and sent in batches. Batches are counted (sent and
+    received) so that the coordinator can detect termination.
+    """
+    layout = Layout.fromDict(layout_dict)
+    # h is computed once per pushed state: the memoized version would only keep up to
+    # its cache size of states alive in every worker
+    evaluate = HEURISTICS.get(heuristic, heuristic1)
+    inbox = inboxes[index]
+    open_list = []
+    # packed key -> (g, parent packed key, action)
+    table = {}
+    buffers = [[] for _ in range(workers)]
+    incumbent = math.inf
+    sent = received = counter = 0
+    expanded = generated = duplicates = peak_open = 0
+    heuristic_time = 0.0
+
+    def insert(key, g, parent, action, state=None):
+        # put a state on this worker's OPEN if it improves on the known g
+        nonlocal incumbent, counter, duplicates, peak_open, heuristic_time
+        known = table.get(key)
+        if known is not None and known[0] <= g:
+            duplicates += 1
+            return
+        table[key] = (g, parent, action)
+        if state is None:
+            state = RushHourPuzzle.fromPositions(layout, layout.unpack(key))
+        if state.isGoal():
+            # a generated goal is already a solution: it becomes the incumbent if better
+            if g < incumbent:
+                incumbent = g
+                results.put((FOUND, index, g, key))
+            return
+        start = time.perf_counter()
+        f = g + evaluate(state)
+        heuristic_time += time.perf_counter() - start
+        if f < incumbent:
+            counter += 1
+            # only the packed key is kept, the state is unpacked again when popped
+            heapq.heappush(open_list, (f, counter, g, key))
+            peak_open = max(peak_open, len(open_list))
+
+    def flush():
+        nonlocal sent
+        for destination, buffer in enumerate(buffers):
+            if buffer:
+                inboxes[destination].put((BATCH, buffer))
+                buffers[destination] = []
+                sent += 1
+
+    def hasWork():
+        # drop the stale entries and those that cannot beat the incumbent any more
+        while open_list:
+            f, _, g, key = open_list[0]
+            if f < incumbent and g == table[key][0]:
+                return True
+            heapq.heappop(open_list)
+        return False
+
+    def handle(message):
+        # returns False when the worker must stop
+        nonlocal incumbent, received
+        kind = message[0]
+        if kind == BATCH:
+            received += 1
+            for key, g, parent, action in message[1]:
+                insert(key, g, parent, action)
+        elif kind == INCUMBENT:
+            incumbent = min(incumbent, message[1])
+        elif kind == PROBE:
+            # a worker holding unsent successors is not idle, whatever its OPEN says
+            results.put((STATUS, index, message[1], not hasWork() and not any(buffers), sent, received, expanded,
+                         len(open_list)))
+        elif kind == TRACE:
+            _, parent, action = table[message[1]]
+            results.put((PARENT, message[1], parent, action))
+        elif kind == STOP:
+            results.put((DONE, index, expanded, generated, duplicates, peak_open, heuristic_time))
+            return False
+        return True
+
+    while True:
+        try:
+            while True:
+                if not handle(inbox.get_nowait()):
+                    return
+        except Empty:
+            pass
+        if not hasWork():
+            # idle: everything buffered must go out before waiting, or nobody would wake up
+            flush()
+            if not handle(inbox.get()):
+                return
+            continue
+        for _ in range(batch_size):
+            if not hasWork():
+                break
+            _, _, g, key = heapq.heappop(open_list)
+            state = RushHourPuzzle.fromPositions(layout, layout.unpack(key))
+            expanded += 1
+            for action, successor in state.successorFunction():
+                generated += 1
+                destination = owner(successor, workers)
+                if destination == index:
+                    insert(successor.pack(), g + 1, key, action, successor)
+                else:
+                    buffers[destination].append((successor.pack(), g + 1, key, action))
+        for destination, buffer in enumerate(buffers):
+            if len(buffer) >= batch_size:
+                inboxes[destination].put((BATCH, buffer))
+                buffers[destination] = []
+                sent += 1
+
+
+class Search:
+    @staticmethod
+    def hda_star(initial_state, heuristic_choice=4, workers=None, stats=None, batch_size=64, probe_interval=0.05):
+        """
+        Hash-distributed A* (HDA*) over worker processes. Every state belongs to the
+        worker given by its Zobrist hash, and each worker runs A* on its own states.
+        The cost of the best goal generated so far (the incumbent) is broadcast, and
+        nodes whose f reaches it are pruned. The search ends when every worker is idle
+        and no batch is in flight: two probe waves in a row must report the same
+        message counts with as many batches received as sent. The incumbent is then
+        optimal if the heuristic is admissible (4 is the default). The workers report
+        their counters with each probe wave, which calls stats.tick once, and their
+        totals (heuristic time included) when they stop. How the throughput scales with
+        the number of workers has not been measured.
+        Returns (goal_node, explored_count) like Search.a_star.
+        """
+        stats = stats if stats is not None else SearchStats()
+        workers = workers or multiprocessing.cpu_count()
+        layout = initial_state.layout
+        if initial_state.isGoal():
+            return Node(initial_state, heuristic=heuristic_choice), 0
+
+        inboxes = [multiprocessing.Queue() for _ in range(workers)]
+        results = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=worker, daemon=True,
+                                             args=(i, workers, layout.toDict(), heuristic_choice, inboxes, results,
+                                                   batch_size))
+                     for i in range(workers)]
+        for process in processes:
+            process.start()
+
+        best, goal_key = math.inf, None
+        base = stats.expanded
+        try:
+            # the initial state is the one batch sent by the coordinator
+            inboxes[owner(initial_state, workers)].put((BATCH, [(initial_state.pack(), 0, None, None)]))
+            wave, previous = 0, None
+            while True:
+                wave += 1
+                for inbox in inboxes:
+                    inbox.put((PROBE, wave))
+                answers = {}
+                while len(answers) < workers:
+                    message = results.get()
+                    if message[0] == FOUND and message[2] < best:
+                        best, goal_key = message[2], message[3]
+                        for inbox in inboxes:
+                            inbox.put((INCUMBENT, best))
+                    elif message[0] == STATUS and message[2] == wave:
+                        answers[message[1]] = message[3:]
+                # tick records one expansion: the count reported by the workers replaces it
+                stats.expanded = base + sum(answer[3] for answer in answers.values()) - 1
+                stats.tick(sum(answer[4] for answer in answers.values()))
+                idle = all(answer[0] for answer in answers.values())
+                counts = tuple(answers[i][1:3] for i in range(workers))
+                sent = 1 + sum(count[0] for count in counts)
+                received = sum(count[1] for count in counts)
+                if idle and sent == received and counts == previous:
+                    break
+                previous = counts if idle and sent == received else None
+                time.sleep(probe_interval)
+
+            # walk the parent pointers back from the goal, asking each state's owner
+            path = []
+            key = goal_key
+            while key is not None:
+                state = RushHourPuzzle.fromPositions(layout, layout.unpack(key))
+                inboxes[owner(state, workers)].put((TRACE, key))
+                while True:
+                    message = results.get()
+                    if message[0] == PARENT and message[1] == key:
+                        break
+                path.append((message[3], state))
+                key = message[2]
+        finally:
+            for inbox in inboxes:
+                inbox.put((STOP,))
+            stopped = expanded = peaks = 0
+            while stopped < workers:
+                try:
+                    message = results.get(timeout=5)
+                except Empty:
+                    break
+                if message[0] == DONE:
+                    stopped += 1
+                    expanded += message[2]
+                    stats.generated += message[3]
+                    stats.duplicates += message[4]
+                    peaks += message[5]
+                    stats.heuristic_time += message[6]
+            stats.expanded = base + expanded
+            # the sum of the per-worker peaks bounds the peak of the whole OPEN
+            stats.peak_open = max(stats.peak_open, peaks)
+            for process in processes:
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+        stats.finish()
+
+        if goal_key is None:
+            return None, stats.expanded
+        node = None
+        for action, state in reversed(path):
+            node = Node(state, node, action or "", heuristic=heuristic_choice)
+        return node, stats.expanded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel hash-distributed A* on a Rush Hour CSV.")
+    parser.add_argument("csv_file")
+    parser.add_argument("--heuristic", type=int, default=4)
+    parser.add_argument("-j", "--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+
+    stats = SearchStats()
+    goal_node, explored_count = Search.hda_star(RushHourPuzzle(args.csv_file), args.heuristic, args.workers, stats,
+                                                args.batch_size)
+    if goal_node is None:
+        print("No solution found.")
+        return
+    print(f"Path cost: {goal_node.g}")
+    print(f"Number of explored_counts: {explored_count}")
+    print(f"Stats: {stats.summary()}")
+    print("Moves: {}".format(" ".join(action for action in goal_node.getSolution() if action)))
+
+
+if __name__ == "__main__":
+    main()
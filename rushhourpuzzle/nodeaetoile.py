@@ -1,3 +1,160 @@
+import math
+from functools import lru_cache
+
+
+# ---- Heuristiques ----
+# They only read state.layout, state.positions and state.flatBoard(), so they
+# apply to a RushHourPuzzle as well as to an in-place RushHourBoard.
+def heuristic1(state):
+    layout = state.layout
+    if layout.xIndex is None:
+        return 0
+    return layout.board_width - 2 - state.positions[layout.xIndex]
+
+
+def heuristic2(state):
+    layout = state.layout
+    if layout.xIndex is None:
+        return 0
+    x = state.positions[layout.xIndex]
+    start = layout.xRowStart
+    unique_vehicles = set(state.flatBoard()[start + x:start + layout.board_width])
+    if ' ' in unique_vehicles:
+        return heuristic1(state) + len(unique_vehicles) - 2
+    return heuristic1(state) + len(unique_vehicles) - 1
+
+
+def heuristic3(state):
+    layout = state.layout
+    if layout.xIndex is None:
+        return 0
+    x, length = state.positions[layout.xIndex], layout.lengths[layout.xIndex]
+    start = layout.xRowStart
+    distance_to_exit = layout.board_width - (x + length)
+    row = state.flatBoard()[start + x + length:start + layout.board_width]
+    obstacles = len(row) - row.count(' ')
+    return distance_to_exit + obstacles
+
+
+def heuristic4(state):
+    """
+    Blocker graph: cells car X still has to travel, plus for each vehicle in front
+    of it the fewest moves that get it out of the lane (Layout.clearingOptions):
+    the cells it slides, plus, recursively, the moves of the vehicles standing in
+    the cells it sweeps, taking the cheapest way out at every level. Every vehicle
+    looked at joins the counted set and costs nothing afterwards, so the terms
+    bound the moves of disjoint sets of vehicles and the sum never overestimates.
+    """
+    layout = state.layout
+    if layout.xIndex is None:
+        return 0
+    x, length = state.positions[layout.xIndex], layout.lengths[layout.xIndex]
+    w = layout.board_width
+    h = w - 2 - x
+    if h <= 0:
+        return 0
+    start = layout.xRowStart
+    cells = state.flatBoard()
+    positions = state.positions
+    counted = {layout.ids[layout.xIndex]}
+
+    def clear(index, first, last):
+        # moves of vehicle `index` and of the vehicles in its way to leave cells first..last
+        options = layout.clearingOptions(index, positions[index], first, last)
+        if not options:
+            # walled in for good: the state is a dead end, any bound holds
+            return 1
+        best = math.inf
+        for distance, swept in options:
+            if distance >= best:
+                continue
+            # first and last swept cells held by each vehicle not counted yet
+            spans = {}
+            for cell in swept:
+                vehicle = cells[cell]
+                if vehicle != ' ' and vehicle not in counted:
+                    if vehicle in spans:
+                        spans[vehicle][1] = cell
+                    else:
+                        spans[vehicle] = [cell, cell]
+            counted.update(spans)
+            total = distance
+            for vehicle, (first_cell, last_cell) in spans.items():
+                total += clear(layout.indexOf[vehicle], first_cell, last_cell)
+            best = min(best, total)
+        return best
+
+    blockers = []
+    for cell in cells[start + x + length:start + w]:
+        if cell != ' ' and cell not in counted:
+            counted.add(cell)
+            blockers.append(cell)
+    for blocker in blockers:
+        index = layout.indexOf.get(blocker)
+        if index is None or layout.orientations[index] == 'H':
+            # a wall or a horizontal vehicle: it never leaves the lane
+            h += 1
+        else:
+            cell = start + layout.lanes[index]
+            h += clear(index, cell, cell)
+    return h
+
+
+# ---- Registre des heuristiques ----
+# HEURISTICS holds the plain functions (usable on a RushHourBoard); Node goes through
+# a memoized copy so that a state generated again does not pay for h twice.
+HEURISTICS = {}
+_memoized = {}
+
+
+def registerHeuristic(name, function, *aliases, cache_size=1 << 16):
+    """Register function(state) -> h under name and its aliases."""
+    memoized = lru_cache(maxsize=cache_size)(function) if cache_size else function
+    for key in (name,) + aliases:
+        HEURISTICS[key] = function
+        _memoized[key] = memoized
+
+
+def evaluateHeuristic(heuristic, state):
+    # only the selected heuristic runs; unknown choices fall back to heuristic1 as before
+    return _memoized.get(heuristic, _memoized[1])(state)
+
+
+def heuristic5(state):
+    """
+    Lower bound in macro moves (Search.a_star with macro=True, cost="moves"): one
+    slide of car X plus one for each distinct vehicle or wall in front of it. The
+    cell-counting heuristics above overestimate under that cost.
+    """
+    layout = state.layout
+    if layout.xIndex is None or state.positions[layout.xIndex] == layout.board_width - 2:
+        return 0
+    x, length = state.positions[layout.xIndex], layout.lengths[layout.xIndex]
+    row = state.flatBoard()[layout.xRowStart + x + length:layout.xRowStart + layout.board_width]
+    return 1 + len(set(row) - {' '})
+
+
+registerHeuristic(1, heuristic1, "distance")
+registerHeuristic(2, heuristic2, "distinct_blockers")
+registerHeuristic(3, heuristic3, "occupied_cells")
+registerHeuristic(4, heuristic4, "blocker_graph")
+registerHeuristic(5, heuristic5, "macro_blockers")
+
+
+def checkHeuristic(heuristic, macro=False, cost="moves"):
+    """
+    Resolve the default heuristic (None) for an action model: 5 under macro moves
+    counted as moves, 3 otherwise. There the cell-counting heuristics overestimate,
+    so choosing one of them raises ValueError.
+    """
+    macro_moves = macro and cost == "moves"
+    if heuristic is None:
+        return 5 if macro_moves else 3
+    if macro_moves and HEURISTICS.get(heuristic, heuristic1) is not heuristic5:
+        raise ValueError(f"Heuristic {heuristic} is not admissible for macro moves counted as moves, use 5")
+    return heuristic
+
+
 class Node:
     def __init__(self, rushHourPuzzle, parent=None, action="", c=1, heuristic=1):
         self.state = rushHourPuzzle
@@ -10,41 +167,20 @@ class Node:
         self.heuristic_used = heuristic  
     # ---- Heuristiques ----
     def heuristic1(self):
-        for vehicle in self.state.vehicles:
-            if vehicle["id"] == 'X':
-                return self.state.board_width - 2 - vehicle["x"]
-        return 0
+        return heuristic1(self.state)
 
     def heuristic2(self):
-        for vehicle in self.state.vehicles:
-            if vehicle["id"] == 'X':
-                unique_vehicles = set(self.state.board[vehicle["y"]][vehicle["x"]:])
-                if ' ' in unique_vehicles:
-                    return self.heuristic1() + len(unique_vehicles) - 2
-                return self.heuristic1() + len(unique_vehicles) - 1
-        return 0
+        return heuristic2(self.state)
 
     def heuristic3(self):
-        for vehicle in self.state.vehicles:
-            if vehicle["id"] == 'X':
-                x, y, length = vehicle["x"], vehicle["y"], vehicle["length"]
-                distance_to_exit = self.state.board_width - (x + length)
-                obstacles = 0
-                for col in range(x + length, self.state.board_width):
-                    if self.state.board[y][col] != ' ':
-                        obstacles += 1
-                return distance_to_exit + obstacles
-        return 0
+        return heuristic3(self.state)
+
+    def heuristic4(self):
+        return heuristic4(self.state)
 
     # ---- Méthode pour définir f ----
     def setF(self, heuristic):
-        heuristics = {
-            1: self.heuristic1(),
-            2: self.heuristic2(),
-            3: self.heuristic3()
-        }
-        h_value = heuristics.get(heuristic, self.heuristic1())
-        self.h = h_value
+        self.h = evaluateHeuristic(heuristic, self.state)
         self.f = self.g + self.h
 
     # ---- Fonctions de chemin ----
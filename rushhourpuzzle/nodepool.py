@@ -0,0 +1,93 @@
+from array import array
+
+from RushHourPuzzle import RushHourPuzzle
+
+NO_PARENT = -1
+
+
+class NodePool:
+    """
+    Array-backed storage of search nodes. Node i is only its packed state key
+    (keys[i]), the index of its parent (parents[i]), an action code (actions[i]) and
+    its cost (g[i]): about 22 bytes per node, with no state object kept alive.
+    Action codes index a table of the distinct action names met by the search.
+    States are rebuilt from their key on demand, e.g. when a node is expanded.
+    """
+
+    def __init__(self, layout):
+        self.layout = layout
+        # keys wider than 64 bits do not fit an array: fall back to a list of ints
+        self.keys = array("Q") if layout.packBits * len(layout.ids) <= 64 else []
+        self.parents = array("q")
+        self.actions = array("H")
+        self.g = array("I")
+        self.actionNames = [""]
+        self.actionCodes = {"": 0}
+
+    def __len__(self):
+        return len(self.parents)
+
+    def add(self, key, parent=NO_PARENT, action="", g=0):
+        """Append a node and return its index."""
+        code = self.actionCodes.get(action)
+        if code is None:
+            code = self.actionCodes[action] = len(self.actionNames)
+            self.actionNames.append(action)
+        self.keys.append(key)
+        self.parents.append(parent)
+        self.actions.append(code)
+        self.g.append(g)
+        return len(self.parents) - 1
+
+    def state(self, index):
+        return RushHourPuzzle.fromPositions(self.layout, self.layout.unpack(self.keys[index]))
+
+    def node(self, index):
+        return PoolNode(self, index)
+
+
+class PoolNode:
+    """
+    Light handle on one node of a NodePool, with the interface of the other Node
+    classes. The states are rebuilt only when asked for, so keeping the goal node
+    costs nothing until its path is read.
+    """
+
+    __slots__ = ("pool", "index")
+
+    def __init__(self, pool, index):
+        self.pool = pool
+        self.index = index
+
+    @property
+    def state(self):
+        return self.pool.state(self.index)
+
+    @property
+    def parent(self):
+        parent = self.pool.parents[self.index]
+        return None if parent == NO_PARENT else PoolNode(self.pool, parent)
+
+    @property
+    def action(self):
+        return self.pool.actionNames[self.pool.actions[self.index]]
+
+    @property
+    def g(self):
+        return self.pool.g[self.index]
+
+    def indices(self):
+        # node indices from the root down to this node
+        chain = []
+        index = self.index
+        while index != NO_PARENT:
+            chain.append(index)
+            index = self.pool.parents[index]
+        return chain[::-1]
+
+    def getPath(self):
+        return [self.pool.state(index) for index in self.indices()]
+
+    def getSolution(self):
+        # like Nodebfs.Node, the root has no action
+        return [self.pool.actionNames[self.pool.actions[index]] for index in self.indices()[1:]]
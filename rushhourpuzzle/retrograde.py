@@ -0,0 +1,229 @@
+import argparse
+import json
+import struct
+from array import array
+from bisect import bisect_left
+from collections import deque
+
+from RushHourPuzzle import Layout, RushHourPuzzle
+
+
+def packedMoves(layout):
+    """
+    Return (successors, isGoal) working directly on packed keys, without building
+    states: successors(key) lists the keys one move away and isGoal(key) tests car X.
+    Occupancy is the row-major bitboard of the layout (Layout.rowMasks).
+    """
+    w, bits = layout.board_width, layout.packBits
+    count = len(layout.ids)
+    mask = (1 << bits) - 1
+    shifts = [bits * (count - 1 - index) for index in range(count)]
+    walls = layout.wallRows
+    occupancy = layout.rowMasks
+    back, forth = [], []
+    for index, (orientation, length, lane) in enumerate(zip(layout.orientations, layout.lengths, layout.lanes)):
+        step, limit = (1, w) if orientation == 'H' else (w, layout.board_height)
+        first = [lane * w + p if orientation == 'H' else p * w + lane for p in range(limit - length + 1)]
+        # cell freed or taken by a move back / forth, 0 when the edge of the board is reached
+        back.append([1 << (cell - step) if p > 0 else 0 for p, cell in enumerate(first)])
+        forth.append([1 << (cell + step * length) if p + length < limit else 0 for p, cell in enumerate(first)])
+    units = [1 << shift for shift in shifts]
+    vehicles = list(zip(shifts, occupancy, back, forth, units))
+
+    def successors(key):
+        cells = walls
+        for shift, masks, _, _, _ in vehicles:
+            cells |= masks[(key >> shift) & mask]
+        keys = []
+        for shift, _, backs, forths, unit in vehicles:
+            position = (key >> shift) & mask
+            cell = backs[position]
+            if cell and not cells & cell:
+                keys.append(key - unit)
+            cell = forths[position]
+            if cell and not cells & cell:
+                keys.append(key + unit)
+        return keys
+
+    x = layout.xIndex
+    goals = set() if x is None else {p for p in range(len(occupancy[x])) if layout.vehicleXY(x, p)[0] == w - 2}
+
+    def isGoal(key):
+        return x is not None and (key >> shifts[x]) & mask in goals
+
+    return successors, isGoal
+
+
+class DistanceTable:
+    """
+    Exact distance to the goal of every state of one component. The states are kept
+    as a sorted array of packed keys, so the rank of a state is its index in that
+    array, and the distances are a parallel array of 16-bit values.
+    """
+
+    UNREACHABLE = 0xFFFF
+    MAGIC = b"RHDT"
+
+    def __init__(self, layout, keys, distances):
+        self.layout = layout
+        self.keys = keys
+        self.distances = distances
+
+    @classmethod
+    def build(cls, initial_state, max_states=None, min_distance=None):
+        """
+        Enumerate the component of initial_state, then run a backward BFS from all of
+        its goal states. Returns None if the component has more than max_states states.
+        With min_distance, also returns None without the backward BFS when no state
+        of the component can be that far from a goal: every state is at most R moves
+        from the start (R, the depth of the enumeration) and the start at most g0
+        from a goal (g0, the depth of the first goal met), so no distance exceeds
+        g0 + R, and a component without goals has none.
+        """
+        layout = initial_state.layout
+        if layout.packBits * len(layout.ids) > 64:
+            raise ValueError("Layout too large for 64-bit packed states")
+        successors, isGoal = packedMoves(layout)
+        # 1) forward enumeration of the reachable component, one layer at a time. A
+        # bounded build keeps the successor lists (seen maps each key to its own) so
+        # that the backward BFS does not generate them again; an unbounded one, which
+        # may cover a whole large component, only keeps the keys.
+        start = initial_state.pack()
+        keep = max_states is not None
+        seen = {start: None} if keep else {start}
+        layer = [start]
+        depth = 0
+        first_goal = 0 if isGoal(start) else None
+        while layer:
+            next_layer = []
+            for key in layer:
+                moves = successors(key)
+                if keep:
+                    seen[key] = moves
+                for successor in moves:
+                    if successor not in seen:
+                        if keep:
+                            seen[successor] = None
+                        else:
+                            seen.add(successor)
+                        next_layer.append(successor)
+                if max_states is not None and len(seen) > max_states:
+                    return None
+            if not next_layer:
+                break
+            depth += 1
+            if first_goal is None and any(isGoal(key) for key in next_layer):
+                first_goal = depth
+            layer = next_layer
+        if min_distance is not None and (first_goal is None or first_goal + depth < min_distance):
+            return None
+
+        # 2) backward BFS: moves are reversible, so successors are also predecessors
+        neighbours = seen.__getitem__ if keep else successors
+        queue = deque(key for key in seen if isGoal(key))
+        found = dict.fromkeys(queue, 0)
+        while queue:
+            key = queue.popleft()
+            distance = found[key] + 1
+            for successor in neighbours(key):
+                if successor not in found:
+                    found[successor] = distance
+                    queue.append(successor)
+        keys = array("Q", sorted(seen))
+        del seen
+        distances = array("H", (found.get(key, cls.UNREACHABLE) for key in keys))
+        return cls(layout, keys, distances)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def rank(self, state):
+        key = state.pack()
+        rank = bisect_left(self.keys, key)
+        if rank == len(self.keys) or self.keys[rank] != key:
+            return None
+        return rank
+
+    def distance(self, state):
+        """Moves left to the goal, None if the state is outside the component or cannot reach a goal."""
+        rank = self.rank(state)
+        if rank is None or self.distances[rank] == self.UNREACHABLE:
+            return None
+        return self.distances[rank]
+
+    def solve(self, state):
+        """Optimal move list from state, found by walking down the distances."""
+        distance = self.distance(state)
+        if distance is None:
+            return None
+        moves = []
+        while distance:
+            for action, successor in state.successorFunction():
+                if self.distance(successor) == distance - 1:
+                    moves.append(action)
+                    state, distance = successor, distance - 1
+                    break
+        return moves
+
+    def histogram(self):
+        counts = {}
+        for distance in self.distances:
+            counts[distance] = counts.get(distance, 0) + 1
+        return counts
+
+    def farthest(self):
+        """Return (max distance, ranks of the solvable states at that distance from the goal)."""
+        reachable = [d for d in self.distances if d != self.UNREACHABLE]
+        if not reachable:
+            return None, []
+        top = max(reachable)
+        return top, [rank for rank, d in enumerate(self.distances) if d == top]
+
+    def save(self, path):
+        header = json.dumps(self.layout.toDict()).encode()
+        with open(path, "wb") as f:
+            f.write(struct.pack("<4sII", self.MAGIC, len(header), len(self.keys)))
+            f.write(header)
+            self.keys.tofile(f)
+            self.distances.tofile(f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            magic, header_size, count = struct.unpack("<4sII", f.read(12))
+            if magic != cls.MAGIC:
+                raise ValueError(f"{path} is not a distance table")
+            layout = Layout.fromDict(json.loads(f.read(header_size)))
+            keys, distances = array("Q"), array("H")
+            keys.fromfile(f, count)
+            distances.fromfile(f, count)
+        return cls(layout, keys, distances)
+
+    def state(self, puzzle):
+        """Re-express a puzzle loaded elsewhere on this table's layout object."""
+        return RushHourPuzzle.fromPositions(self.layout, puzzle.positions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distance-to-goal table of a whole Rush Hour component.")
+    parser.add_argument("csv_file")
+    parser.add_argument("--save", help="write the table to this file")
+    parser.add_argument("--load", help="read the table from this file instead of building it")
+    args = parser.parse_args()
+
+    puzzle = RushHourPuzzle(args.csv_file)
+    table = DistanceTable.load(args.load) if args.load else DistanceTable.build(puzzle)
+    if args.save:
+        table.save(args.save)
+    reachable = [d for d in table.distances if d != DistanceTable.UNREACHABLE]
+    print(f"Component size: {len(table)}, solvable states: {len(reachable)}, max distance: {max(reachable, default=0)}")
+    moves = table.solve(table.state(puzzle))
+    if moves is None:
+        print("No solution found.")
+    else:
+        print(f"Path cost: {len(moves)}")
+        print("Moves: {}".format(" ".join(moves)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import logging
+import time
+
+logger = logging.getLogger("rushhour")
+
+
+class SearchStats:
+    """
+    Counters filled in by every solver instead of printing at each step. An optional
+    progress callback receives the stats object at most once every `interval` seconds.
+    """
+
+    def __init__(self, progress=None, interval=1.0):
+        self.expanded = 0
+        self.generated = 0
+        self.duplicates = 0
+        self.stale = 0
+        self.peak_open = 0
+        self.heuristic_time = 0.0
+        self.start = time.perf_counter()
+        self.elapsed = 0.0
+        self.progress = progress
+        self.interval = interval
+        self._next_report = self.start + interval
+
+    def tick(self, open_size):
+        """Record one expansion with the current size of OPEN, and report progress if due."""
+        self.expanded += 1
+        if open_size > self.peak_open:
+            self.peak_open = open_size
+        if self.progress is not None:
+            now = time.perf_counter()
+            if now >= self._next_report:
+                self.elapsed = now - self.start
+                self._next_report = now + self.interval
+                self.progress(self)
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.start
+        return self
+
+    @property
+    def branching_factor(self):
+        # mean number of successors generated per expansion
+        return self.generated / self.expanded if self.expanded else 0.0
+
+    @property
+    def nodes_per_second(self):
+        return self.expanded / self.elapsed if self.elapsed else 0.0
+
+    def asDict(self):
+        return {"expanded": self.expanded, "generated": self.generated, "duplicates": self.duplicates,
+                "stale": self.stale, "peak_open": self.peak_open, "branching_factor": round(self.branching_factor, 3),
+                "heuristic_time": round(self.heuristic_time, 6), "time": round(self.elapsed, 6),
+                "nodes_per_second": round(self.nodes_per_second, 1)}
+
+    def summary(self):
+        return (f"expanded {self.expanded}, generated {self.generated}, duplicates pruned {self.duplicates}, "
+                f"peak OPEN {self.peak_open}, branching {self.branching_factor:.2f}, "
+                f"h time {self.heuristic_time:.3f}s, {self.nodes_per_second:.0f} nodes/s")
+
+
+def logProgress(stats):
+    """Progress callback writing to the 'rushhour' logger, silent unless logging is configured."""
+    logger.info("%d expanded, OPEN peak %d, %.0f nodes/s", stats.expanded, stats.peak_open,
+                stats.expanded / stats.elapsed if stats.elapsed else 0.0)
@@ -0,0 +1,128 @@
+import argparse
+import hashlib
+import json
+import sqlite3
+import time
+
+from RushHourPuzzle import RushHourPuzzle
+from searchstats import SearchStats
+from utils import runSolver, solutionMoves
+
+
+class SolutionCache:
+    """
+    On-disk cache of solved puzzles in front of the searches. Entries are keyed by a
+    canonical hash of the puzzle (size, walls, vehicles with normalized ids) and of
+    the solver, and the least recently used ones are evicted past max_entries.
+    """
+
+    def __init__(self, path="solutions.sqlite", max_entries=100000):
+        self.max_entries = max_entries
+        # several batch workers may share the file: wait for the lock instead of failing
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS solutions ("
+            "key TEXT PRIMARY KEY, moves TEXT, stats TEXT, last_used REAL)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS solutions_last_used ON solutions (last_used)")
+        self.connection.commit()
+
+    @staticmethod
+    def canonicalForm(puzzle):
+        """
+        Return (canonical description, vehicle order). Car X comes first, the other
+        vehicles are sorted by orientation, lane, offset and length and renamed by
+        their rank, so two files that only differ by ids or line order match.
+        """
+        layout = puzzle.layout
+        others = [i for i in range(len(layout.ids)) if i != layout.xIndex]
+        others.sort(key=lambda i: (layout.orientations[i], layout.lanes[i], puzzle.positions[i], layout.lengths[i]))
+        order = ([layout.xIndex] if layout.xIndex is not None else []) + others
+        description = {
+            "size": [layout.board_width, layout.board_height],
+            "walls": sorted(layout.walls),
+            "x": layout.xIndex is not None,
+            "vehicles": [[layout.orientations[i], layout.lanes[i], puzzle.positions[i], layout.lengths[i]] for i in order],
+        }
+        return json.dumps(description, separators=(",", ":")), order
+
+    @classmethod
+    def puzzleKey(cls, puzzle, solver):
+        description, order = cls.canonicalForm(puzzle)
+        return hashlib.sha256(f"{solver}|{description}".encode()).hexdigest(), order
+
+    def get(self, puzzle, solver):
+        """Return (moves, stats) for this puzzle and solver, or None on a miss."""
+        key, order = self.puzzleKey(puzzle, solver)
+        row = self.connection.execute("SELECT moves, stats FROM solutions WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        self.connection.execute("UPDATE solutions SET last_used = ? WHERE key = ?", (time.time(), key))
+        self.connection.commit()
+        moves = json.loads(row[0])
+        if moves is not None:
+            # stored moves use the normalized ids (ranks), map them back to this file's ids
+            ids = puzzle.layout.ids
+            moves = [ids[order[int(rank)]] + ":" + direction
+                     for rank, direction in (move.split(":") for move in moves)]
+        return moves, json.loads(row[1])
+
+    def put(self, puzzle, solver, moves, stats):
+        key, order = self.puzzleKey(puzzle, solver)
+        if moves is not None:
+            rank = {index: r for r, index in enumerate(order)}
+            indexOf = puzzle.layout.indexOf
+            moves = [f"{rank[indexOf[vehicle_id]]}:{direction}"
+                     for vehicle_id, direction in (move.split(":") for move in moves)]
+        self.connection.execute("INSERT OR REPLACE INTO solutions VALUES (?, ?, ?, ?)",
+                                (key, json.dumps(moves), json.dumps(stats), time.time()))
+        self.evict()
+        self.connection.commit()
+
+    def evict(self):
+        count = self.connection.execute("SELECT COUNT(*) FROM solutions").fetchone()[0]
+        if count > self.max_entries:
+            self.connection.execute(
+                "DELETE FROM solutions WHERE key IN "
+                "(SELECT key FROM solutions ORDER BY last_used LIMIT ?)", (count - self.max_entries,))
+
+    def solve(self, puzzle, algorithm="astar", heuristic=4, tt_size=0):
+        """
+        Solve through the cache: a repeated puzzle costs one lookup. Returns
+        (moves, stats, hit) with moves None when the puzzle has no solution.
+        """
+        solver = algorithm if algorithm in ("bfs", "bidirectional") else f"{algorithm}-h{heuristic}"
+        cached = self.get(puzzle, solver)
+        if cached is not None:
+            return cached[0], cached[1], True
+        stats = SearchStats()
+        goal_node, _ = runSolver(algorithm, puzzle, heuristic, tt_size, stats)
+        moves = solutionMoves(goal_node) if goal_node is not None else None
+        stats = stats.asDict()
+        self.put(puzzle, solver, moves, stats)
+        return moves, stats, False
+
+    def close(self):
+        self.connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve a Rush Hour CSV through the on-disk solution cache.")
+    parser.add_argument("csv_file")
+    parser.add_argument("-a", "--algorithm", default="astar", choices=["bfs", "bidirectional", "astar", "idastar"])
+    parser.add_argument("--heuristic", type=int, default=4)
+    parser.add_argument("--cache", default="solutions.sqlite")
+    args = parser.parse_args()
+
+    cache = SolutionCache(args.cache)
+    moves, stats, hit = cache.solve(RushHourPuzzle(args.csv_file), args.algorithm, args.heuristic)
+    cache.close()
+    print(f"Cache {'hit' if hit else 'miss'}, stats: {stats}")
+    if moves is None:
+        print("No solution found.")
+    else:
+        print(f"Path cost: {len(moves)}")
+        print("Moves: {}".format(" ".join(moves)))
+
+
+if __name__ == "__main__":
+    main()
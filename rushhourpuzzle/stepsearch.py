@@ -0,0 +1,251 @@
+import argparse
+import heapq
+import os
+import pickle
+import time
+from collections import deque
+
+import nodeaetoile
+import Nodebfs
+from nodeaetoile import evaluateHeuristic
+from RushHourPuzzle import RushHourPuzzle
+from searchstats import SearchStats
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+RUNNING, SOLVED, EXHAUSTED, CANCELLED, OUT_OF_BUDGET = "running", "solved", "exhausted", "cancelled", "budget"
+
+
+def memoryUsage():
+    """Resident memory of this process in bytes: current on Linux, peak elsewhere, 0 if unknown."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    if resource is not None:
+        # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == "Darwin" else peak * 1024
+    return 0
+
+
+class SteppingSearch:
+    """
+    A search that runs in slices instead of to completion. step(n) expands at most n
+    nodes and returns the status, cancel() stops it for good, and snapshot()/resume()
+    save it to disk and load it back. Budgets on expansions (max_nodes), search time
+    in seconds (max_time) and memory growth in bytes (max_memory) stop it with the
+    status "budget"; raising them and stepping again continues the search.
+    The best partial result is the node of lowest h (then lowest g) seen so far.
+    """
+
+    def __init__(self, initial_state, heuristic=1, stats=None, max_nodes=None, max_time=None, max_memory=None):
+        self.initial_state = initial_state
+        self.heuristic = heuristic
+        self.stats = stats if stats is not None else SearchStats()
+        self.max_nodes = max_nodes
+        self.max_time = max_time
+        self.max_memory = max_memory
+        self.status = RUNNING
+        self.goal = None
+        self.best = None
+        self.best_rank = None
+        # search time accumulated over the slices, the time spent paused is not counted
+        self.elapsed = 0.0
+        self.memory_base = memoryUsage()
+
+    def expand(self):
+        """Expand one node; set self.goal and return True when a goal is found, return None when OPEN is empty."""
+        raise NotImplementedError
+
+    # ---- driving the search ----
+    def consider(self, node, h):
+        """Keep node as the best partial result if it is closer to a goal."""
+        rank = (h, node.g)
+        if self.best_rank is None or rank < self.best_rank:
+            self.best, self.best_rank = node, rank
+
+    def outOfResources(self):
+        if self.max_time is not None and self.elapsed >= self.max_time:
+            return True
+        return self.max_memory is not None and memoryUsage() - self.memory_base >= self.max_memory
+
+    def step(self, count=1):
+        """Expand up to count nodes (or until finished, cancelled or out of budget) and return the status."""
+        if self.status in (SOLVED, EXHAUSTED, CANCELLED):
+            return self.status
+        self.status = RUNNING
+        start = time.perf_counter()
+        for done in range(count):
+            if self.max_nodes is not None and self.stats.expanded >= self.max_nodes:
+                self.status = OUT_OF_BUDGET
+                break
+            # the clock and the memory are only read every 256 expansions
+            if done & 255 == 0:
+                now = time.perf_counter()
+                self.elapsed += now - start
+                start = now
+                if self.outOfResources():
+                    self.status = OUT_OF_BUDGET
+                    break
+            found = self.expand()
+            # cancel() may be called during the expansion, by the progress callback
+            if self.status == CANCELLED:
+                break
+            if found:
+                self.status = SOLVED
+                break
+            if found is None:
+                self.status = EXHAUSTED
+                break
+        self.elapsed += time.perf_counter() - start
+        self.stats.elapsed = self.elapsed
+        return self.status
+
+    def run(self, slice_size=1024):
+        """Step until the search is solved, exhausted, cancelled or out of budget."""
+        while self.step(slice_size) == RUNNING:
+            pass
+        return self.status
+
+    def __iter__(self):
+        """Iterate over the status after each expansion while the search is running."""
+        while self.step(1) == RUNNING:
+            yield self.status
+
+    def cancel(self):
+        self.status = CANCELLED
+
+    def result(self):
+        """The goal node once solved, otherwise the best partial node (None before any expansion)."""
+        return self.goal if self.goal is not None else self.best
+
+    # ---- snapshots ----
+    def snapshot(self, path):
+        """Pickle the whole search to path; the progress callback of the stats is not saved."""
+        progress, self.stats.progress = self.stats.progress, None
+        try:
+            with open(path, "wb") as f:
+                pickle.dump(self, f, pickle.HIGHEST_PROTOCOL)
+        finally:
+            self.stats.progress = progress
+
+    @staticmethod
+    def resume(path):
+        with open(path, "rb") as f:
+            search = pickle.load(f)
+        # memory budgets are relative to the process that runs the search
+        search.memory_base = memoryUsage()
+        return search
+
+
+class SteppingBreadthFirst(SteppingSearch):
+    """Search.breadthFirst in slices. The heuristic only ranks the partial results."""
+
+    def __init__(self, initial_state, heuristic=1, **options):
+        super().__init__(initial_state, heuristic, **options)
+        root = Nodebfs.Node(initial_state)
+        self.open = deque([root])
+        self.seen = {initial_state}
+        self.consider(root, evaluateHeuristic(heuristic, initial_state))
+        if initial_state.isGoal():
+            self.goal, self.status = root, SOLVED
+
+    def expand(self):
+        if not self.open:
+            return None
+        self.stats.tick(len(self.open))
+        current = self.open.popleft()
+        for action, successor in current.state.successorFunction():
+            self.stats.generated += 1
+            if successor in self.seen:
+                self.stats.duplicates += 1
+                continue
+            self.seen.add(successor)
+            child = Nodebfs.Node(successor, current, action)
+            if successor.isGoal():
+                self.goal = child
+                return True
+            self.consider(child, evaluateHeuristic(self.heuristic, successor))
+            self.open.append(child)
+        return False
+
+
+class SteppingAStar(SteppingSearch):
+    """Search.a_star in slices, with the same best-g table and lazy deletion."""
+
+    def __init__(self, initial_state, heuristic=3, **options):
+        super().__init__(initial_state, heuristic, **options)
+        root = nodeaetoile.Node(initial_state, heuristic=heuristic)
+        # a plain int tie-breaker, unlike itertools.count it can be pickled
+        self.counter = 0
+        self.open = [(root.f, 0, root)]
+        self.best_g = {initial_state: 0}
+        self.consider(root, root.h)
+
+    def expand(self):
+        while self.open:
+            _, _, current = heapq.heappop(self.open)
+            if current.g > self.best_g[current.state]:
+                self.stats.stale += 1
+                continue
+            break
+        else:
+            return None
+        self.stats.tick(len(self.open) + 1)
+        if current.state.isGoal():
+            self.goal = current
+            return True
+        for action, successor in current.state.successorFunction():
+            self.stats.generated += 1
+            g = current.g + 1
+            if g >= self.best_g.get(successor, g + 1):
+                self.stats.duplicates += 1
+                continue
+            self.best_g[successor] = g
+            child = nodeaetoile.Node(successor, current, action, heuristic=self.heuristic)
+            self.consider(child, child.h)
+            self.counter += 1
+            heapq.heappush(self.open, (child.f, self.counter, child))
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a Rush Hour search under node, time and memory budgets.")
+    parser.add_argument("csv_file")
+    parser.add_argument("-a", "--algorithm", default="astar", choices=["bfs", "astar"])
+    parser.add_argument("--heuristic", type=int, default=3)
+    parser.add_argument("--max-nodes", type=int, default=None)
+    parser.add_argument("--max-time", type=float, default=None, help="seconds")
+    parser.add_argument("--max-memory", type=float, default=None, help="megabytes")
+    parser.add_argument("--resume", help="continue the search saved in this file instead of starting one")
+    parser.add_argument("--snapshot", help="save the search to this file when it stops unfinished")
+    args = parser.parse_args()
+
+    if args.resume:
+        search = SteppingSearch.resume(args.resume)
+        search.max_nodes, search.max_time = args.max_nodes, args.max_time
+    else:
+        kind = SteppingAStar if args.algorithm == "astar" else SteppingBreadthFirst
+        search = kind(RushHourPuzzle(args.csv_file), args.heuristic, max_nodes=args.max_nodes,
+                      max_time=args.max_time)
+    search.max_memory = args.max_memory * 1e6 if args.max_memory is not None else None
+    status = search.run()
+    node = search.result()
+    print(f"Status: {status}, {search.stats.summary()}")
+    if status == SOLVED:
+        print(f"Path cost: {node.g}")
+    elif node is not None:
+        print(f"Best partial result: g = {node.g}, h = {search.best_rank[0]}")
+    if node is not None:
+        print("Moves: {}".format(" ".join(action for action in node.getSolution() if action)))
+    if args.snapshot and status == OUT_OF_BUDGET:
+        search.snapshot(args.snapshot)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import importlib.util
+import os
+import sys
+
+from nodeaetoile import checkHeuristic
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# The search scripts have spaces in their file names, so they are loaded by path.
+SEARCH_FILES = {"bfs": "Search BFS.py", "astar": "Search A etoile.py"}
+
+
+def loadSearch(kind):
+    """Return the Search class of 'Search BFS.py' (kind 'bfs') or 'Search A etoile.py' ('astar')."""
+    name = "search_" + kind
+    if name not in sys.modules:
+        if HERE not in sys.path:
+            sys.path.insert(0, HERE)
+        spec = importlib.util.spec_from_file_location(name, os.path.join(HERE, SEARCH_FILES[kind]))
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+    return sys.modules[name].Search
+
+
+def runSolver(algorithm, state, heuristic=None, tt_size=0, stats=None, macro=False, cost="moves", workers=None,
+              weight=1, time_limit=None, pruning=False):
+    """
+    Run one of the solvers by name ('bfs', 'frontier', 'bidirectional', 'astar',
+    'arastar', 'idastar', 'hdastar') and return (goal_node, explored_count) like the Search
+    methods do. macro and cost select the multi-cell action model of 'bfs' and
+    'astar', weight makes 'astar' weighted, time_limit stops 'arastar' with its best
+    solution so far, and workers is the number of processes of 'hdastar'. pruning
+    turns on move pruning in 'bfs', 'astar' and 'idastar'. heuristic None picks 3,
+    or 5 for 'astar' under macro moves counted as moves (see checkHeuristic).
+    """
+    if macro and algorithm not in ("bfs", "astar"):
+        raise ValueError(f"Macro moves are not supported by {algorithm}")
+    heuristic = checkHeuristic(heuristic, macro and algorithm == "astar", cost)
+    if algorithm == "bfs":
+        return loadSearch("bfs").breadthFirst(state, stats, macro, pruning)
+    if algorithm == "frontier":
+        return loadSearch("bfs").frontierBreadthFirst(state, stats)
+    if algorithm == "bidirectional":
+        return loadSearch("bfs").bidirectional(state, stats)
+    if algorithm == "astar":
+        return loadSearch("astar").a_star(state, heuristic, stats, macro, cost, weight, pruning)
+    if algorithm == "arastar":
+        return loadSearch("astar").ara_star(state, heuristic, time_limit=time_limit, stats=stats)
+    if algorithm == "idastar":
+        return loadSearch("astar").ida_star(state, heuristic, tt_size, stats, pruning)
+    if algorithm == "hdastar":
+        from hdastar import Search
+        return Search.hda_star(state, heuristic, workers, stats)
+    raise ValueError(f"Unknown algorithm: {algorithm}")
+
+
+def solutionMoves(goal_node):
+    # the A* nodes keep an empty action on the root, the BFS nodes do not
+    return [action for action in goal_node.getSolution() if action]